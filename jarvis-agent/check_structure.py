@@ -1,4 +1,5 @@
 """Verifica la estructura del proyecto Jarvis"""
+import os
 from pathlib import Path
 
 def check_structure():
@@ -62,11 +63,31 @@ def check_structure():
     missing = []
     found = []
     
+    # Un único recorrido del árbol: {carpeta relativa: {archivos}}.
+    # Solo se desciende por las carpetas que llevan a alguna esperada.
+    wanted = {f for f in expected if f != "Archivos raíz"}
+    ancestors = {
+        "/".join(parts[:i]) + "/"
+        for folder in wanted
+        for parts in [folder.rstrip("/").split("/")]
+        for i in range(1, len(parts) + 1)
+    }
+    
+    tree = {}
+    for root, dirs, files in os.walk(base):
+        rel = os.path.relpath(root, base).replace(os.sep, "/") + "/"
+        key = "Archivos raíz" if rel == "./" else rel
+        tree[key] = set(files)
+        prefix = "" if rel == "./" else rel
+        dirs[:] = [d for d in dirs if f"{prefix}{d}/" in ancestors]
+    
     for folder, files in expected.items():
         print(f"\n📁 {folder}")
+        is_root = folder == "Archivos raíz"
+        present = tree.get(folder, set())
         for file in files:
-            filepath = base / folder / file if folder != "Archivos raíz" else base / file
-            if filepath.exists():
+            filepath = base / file if is_root else base / folder / file
+            if file in present:
                 print(f"  ✅ {file}")
                 found.append(str(filepath))
             else:
@@ -3,6 +3,8 @@
 Script para inicializar la base de conocimiento con documentos predefinidos.
 """
 
+import os
+import re
 import sys
 from pathlib import Path
 
@@ -12,6 +14,47 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from jarvis.knowledge.knowledge_base import KnowledgeBase
 
 
+# Primer encabezado "# Título" del documento
+_TITLE_RE = re.compile(r'^# (.+)$', re.MULTILINE)
+
+# El título siempre está arriba: no hace falta escanear el documento entero
+_TITLE_SCAN_CHARS = 4096
+
+
+def _extract_title(content: str) -> str:
+    """Devuelve el primer '# Título' buscando solo en la cabecera."""
+    match = _TITLE_RE.search(content, 0, _TITLE_SCAN_CHARS)
+    return match.group(1).strip() if match else "Sin título"
+
+
+def _prepare(md_file: Path):
+    """Lee y clasifica un archivo. Devuelve el dict para add_tutorials o la excepción."""
+    try:
+        content = md_file.read_text(encoding='utf-8')
+        
+        title = _extract_title(content)
+        
+        filename = md_file.stem.lower()
+        if 'python' in filename:
+            category = 'python'
+        elif 'fastapi' in filename or 'api' in filename:
+            category = 'web'
+        elif 'git' in filename:
+            category = 'version-control'
+        else:
+            category = 'general'
+        
+        return {
+            "title": title,
+            "content": content,
+            "category": category,
+            "source": f"seed/{md_file.name}",
+        }
+    
+    except Exception as e:
+        return e
+
+
 def load_markdown_files(kb: KnowledgeBase, seed_dir: Path):
     """Carga archivos markdown del directorio seed."""
     
@@ -19,7 +62,11 @@ def load_markdown_files(kb: KnowledgeBase, seed_dir: Path):
         print(f"❌ Directorio {seed_dir} no existe")
         return
     
-    md_files = list(seed_dir.glob("*.md"))
+    with os.scandir(seed_dir) as it:
+        md_files = [
+            Path(entry.path) for entry in it
+            if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False)
+        ]
     
     if not md_files:
         print(f"⚠️ No hay archivos .md en {seed_dir}")
@@ -27,40 +74,28 @@ def load_markdown_files(kb: KnowledgeBase, seed_dir: Path):
     
     print(f"\n📚 Cargando {len(md_files)} documentos...\n")
     
+    tutorials = []
     for md_file in md_files:
-        try:
-            content = md_file.read_text(encoding='utf-8')
-            
-            lines = content.split('\n')
-            title = "Sin título"
-            for line in lines:
-                if line.startswith('# '):
-                    title = line[2:].strip()
-                    break
-            
-            filename = md_file.stem
-            if 'python' in filename.lower():
-                category = 'python'
-            elif 'fastapi' in filename.lower() or 'api' in filename.lower():
-                category = 'web'
-            elif 'git' in filename.lower():
-                category = 'version-control'
-            else:
-                category = 'general'
-            
-            doc_id = kb.add_tutorial(
-                title=title,
-                content=content,
-                category=category,
-                source=f"seed/{md_file.name}"
-            )
-            
-            print(f"✅ {title}")
-            print(f"   Categoría: {category}")
-            print(f"   ID: {doc_id}\n")
-            
-        except Exception as e:
-            print(f"❌ Error cargando {md_file.name}: {e}\n")
+        result = _prepare(md_file)
+        if isinstance(result, Exception):
+            print(f"❌ Error cargando {md_file.name}: {result}\n")
+            continue
+        tutorials.append(result)
+    
+    if not tutorials:
+        return
+    
+    # Una sola llamada: los embeddings se calculan en lote
+    try:
+        doc_ids = kb.add_tutorials(tutorials)
+    except Exception as e:
+        print(f"❌ Error añadiendo documentos: {e}\n")
+        return
+    
+    for tutorial, doc_id in zip(tutorials, doc_ids):
+        print(f"✅ {tutorial['title']}")
+        print(f"   Categoría: {tutorial['category']}")
+        print(f"   ID: {doc_id}\n")
 
 
 def main():
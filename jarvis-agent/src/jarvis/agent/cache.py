@@ -0,0 +1,73 @@
+"""
+cache.py
+
+Caché en memoria de respuestas del LLM:
+- ResponseCache: LRU exacta con caducidad (TTL)
+
+Solo tiene sentido con temperaturas bajas: a temperatura alta la misma
+conversación debería poder dar respuestas distintas.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence, Tuple
+
+from jarvis.jsonutil import dumps_bytes
+
+
+class ResponseCache:
+    """
+    LRU exacta (clave -> texto) con caducidad por entrada.
+
+    - maxsize: número máximo de respuestas guardadas
+    - ttl: segundos que una respuesta se considera válida
+
+    Es thread-safe: la comparten los turnos del CLI y del servidor web.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, messages: Sequence[Any]) -> str:
+        """Hash estable de (modelo, temperatura, mensajes)."""
+        payload = dumps_bytes([model, temperature, list(messages)])
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Devuelve la respuesta cacheada, o None si no existe o ha caducado."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        """Guarda una respuesta, expulsando la menos usada si está llena."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vacía la caché."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -10,11 +10,24 @@ Estos son los building blocks que usa ToolAgent y otros agentes futuros.
 
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List
+from typing import Any, Deque, Dict, Iterator, Sequence
 
 
-@dataclass
+__all__ = ["AgentConfig", "AgentState", "MAX_HISTORY"]
+
+# Máximo de mensajes por defecto que guarda AgentState en RAM
+# (los más antiguos se descartan)
+MAX_HISTORY = 64
+
+
+def _content_len(message: Dict[str, Any]) -> int:
+    content = message.get("content")
+    return len(content) if isinstance(content, str) else 0
+
+
+@dataclass(slots=True)
 class AgentConfig:
     """
     Configuración base del agente.
@@ -33,30 +46,57 @@ class AgentConfig:
     debug: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentState:
     """
     Estado en memoria del agente (historial de mensajes).
     
-    - history: lista de mensajes en formato OpenAI
+    - history: mensajes en formato OpenAI
       [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}, ...]
     
     Esto es la "memoria corta" de la sesión actual.
     Más adelante lo conectaremos con MemoryStore (SQLite) para persistencia.
+    
+    El historial es un deque acotado a max_messages (MAX_HISTORY por
+    defecto). Al llenarse se descarta de golpe la mitad más antigua, no un
+    mensaje por turno: así el inicio de la conversación que se envía al
+    modelo se mantiene idéntico durante muchos turnos y el proveedor puede
+    reutilizar su caché de prefijo (KV/prompt cache).
     """
-    history: List[Dict[str, Any]] = field(default_factory=list)
+    history: Deque[Dict[str, Any]] = field(default_factory=deque)
+    max_messages: int = MAX_HISTORY
+    # Total de caracteres de contenido, mantenido en cada append
+    _char_total: int = field(default=0, init=False, repr=False)
+    
+    def __post_init__(self) -> None:
+        if not isinstance(self.history, deque) or self.history.maxlen is not None:
+            self.history = deque(self.history)
+        if self.max_messages < 2:
+            raise ValueError("max_messages debe ser al menos 2")
+        while len(self.history) > self.max_messages:
+            self.history.popleft()
+        self._char_total = sum(_content_len(msg) for msg in self.history)
+    
+    def _append(self, message: Dict[str, Any]) -> None:
+        history = self.history
+        if len(history) >= self.max_messages:
+            # Expulsión por bloques: el prefijo solo cambia cada N turnos
+            for _ in range(self.max_messages // 2):
+                self._char_total -= _content_len(history.popleft())
+        history.append(message)
+        self._char_total += _content_len(message)
     
     def add_user(self, content: str) -> None:
         """Añade un mensaje del usuario al historial."""
-        self.history.append({"role": "user", "content": content})
+        self._append({"role": "user", "content": content})
     
     def add_assistant(self, content: str) -> None:
         """Añade un mensaje del asistente al historial."""
-        self.history.append({"role": "assistant", "content": content})
+        self._append({"role": "assistant", "content": content})
     
     def add_tool(self, tool_call_id: str, content: str) -> None:
         """Añade un resultado de tool al historial."""
-        self.history.append({
+        self._append({
             "role": "tool",
             "tool_call_id": tool_call_id,
             "content": content
@@ -65,7 +105,36 @@ class AgentState:
     def clear(self) -> None:
         """Borra todo el historial (reset de sesión)."""
         self.history.clear()
+        self._char_total = 0
+    
+    def trim_to_tokens(self, max_tokens: int) -> int:
+        """
+        Descarta los mensajes más antiguos hasta quedar en max_tokens.
+        
+        Nunca descarta el último mensaje (el turno actual). Devuelve cuántos
+        mensajes se han eliminado.
+        """
+        history = self.history
+        dropped = 0
+        while len(history) > 1 and self._char_total // 4 > max_tokens:
+            self._char_total -= _content_len(history.popleft())
+            dropped += 1
+        return dropped
+    
+    def token_estimate(self) -> int:
+        """Estimación de tokens del historial (~4 chars = 1 token), en O(1)."""
+        return self._char_total // 4
+    
+    def get_messages(self) -> Sequence[Dict[str, Any]]:
+        """
+        Devuelve el historial sin copiarlo.
+        
+        Es de solo lectura: para modificarlo usa add_* / clear().
+        """
+        return self.history
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.history)
     
-    def get_messages(self) -> List[Dict[str, Any]]:
-        """Devuelve una copia del historial."""
-        return list(self.history)
\ No newline at end of file
+    def __len__(self) -> int:
+        return len(self.history)
\ No newline at end of file
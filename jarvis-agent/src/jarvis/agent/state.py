@@ -15,7 +15,8 @@ De momento dejamos helpers útiles para cuando los necesitemos.
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Set
 from datetime import datetime
 
 
@@ -28,6 +29,9 @@ def truncate_history(
     
     Útil para evitar que el contexto crezca infinitamente.
     Siempre mantiene el system prompt si existe.
+    
+    AgentState ya acota su historial con un deque (MAX_HISTORY); esta función
+    queda para listas sueltas de mensajes.
     """
     if len(history) <= max_messages:
         return history
@@ -44,16 +48,18 @@ def count_tokens_estimate(messages: List[Dict[str, Any]]) -> int:
     Estimación aproximada de tokens (regla: ~4 chars = 1 token).
     
     Para control real de tokens, usar tiktoken.
-    Esto es solo una aproximación rápida.
+    Esto es solo una aproximación rápida. Para el historial de la sesión
+    es más barato AgentState.token_estimate(), que no recorre los mensajes.
     """
-    total_chars = 0
-    for msg in messages:
-        content = msg.get("content", "")
-        if isinstance(content, str):
-            total_chars += len(content)
-        # Si hay tool_calls u otros campos, también los contamos
-        if "tool_calls" in msg:
-            total_chars += len(str(msg["tool_calls"]))
+    total_chars = sum(
+        len(content)
+        for content in (msg.get("content") for msg in messages)
+        if isinstance(content, str)
+    )
+    # Si hay tool_calls u otros campos, también los contamos
+    total_chars += sum(
+        len(str(msg["tool_calls"])) for msg in messages if "tool_calls" in msg
+    )
     
     return total_chars // 4
 
@@ -75,11 +81,15 @@ class SessionContext:
     De momento es opcional, pero lo dejamos listo.
     """
     
+    __slots__ = ("session_id", "started_at", "interaction_count", "tools_used", "_tools_used_set")
+    
     def __init__(self, session_id: Optional[str] = None):
-        self.session_id = session_id or f"session_{format_timestamp()}"
+        self.session_id = session_id or f"session_{time.time_ns():x}"
         self.started_at = format_timestamp()
         self.interaction_count = 0
+        # Lista para conservar el orden + set para deduplicar en O(1)
         self.tools_used: List[str] = []
+        self._tools_used_set: Set[str] = set()
     
     def record_interaction(self) -> None:
         """Incrementa contador de interacciones."""
@@ -87,7 +97,8 @@ class SessionContext:
     
     def record_tool_use(self, tool_name: str) -> None:
         """Registra que se usó una tool."""
-        if tool_name not in self.tools_used:
+        if tool_name not in self._tools_used_set:
+            self._tools_used_set.add(tool_name)
             self.tools_used.append(tool_name)
     
     def get_stats(self) -> Dict[str, Any]:
@@ -6,31 +6,322 @@ Agente híbrido con memoria persistente y visión.
 
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
 import re
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import threading
+from contextlib import closing
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-import requests
 
+from jarvis.agent.cache import ResponseCache
 from jarvis.agent.prompts import SYSTEM_PROMPT
 from jarvis.agent.runner import AgentConfig, AgentState
+from jarvis.jsonutil import (
+    dumps as _dumps,
+    dumps_bytes as _dumps_bytes,
+    dumps_sorted as _dumps_sorted,
+    loads as _loads,
+)
+from jarvis.memory.writer import MemoryWriter
 from jarvis.tools.registry import ToolRegistry, build_default_registry
 
 
 Message = Dict[str, Any]
 
+# Mensaje de sistema compartido por todas las llamadas. No mutarlo: los SDKs
+# de Groq/Ollama solo lo leen, así que reutilizar la referencia es seguro.
+_SYSTEM_MESSAGE: Message = {"role": "system", "content": SYSTEM_PROMPT}
+# Estimación (~4 chars/token) del tamaño del system prompt: presupuesto de
+# contexto y num_keep de Ollama
+_SYSTEM_TOKENS = len(SYSTEM_PROMPT) // 4
+
+# Clientes Groq compartidos por API key: un solo pool de conexiones aunque
+# haya varios agentes (CLI + web, tests...)
+_GROQ_CLIENTS: Dict[str, Any] = {}
+_GROQ_CLIENTS_LOCK = threading.Lock()
+
+# Sesión HTTP (requests) compartida, creada en el primer uso
+_HTTP_SESSION: Any = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+# Patrones que indican que la petición necesita herramientas (Ollama),
+# agrupados por categoría. Se compilan una vez en una sola alternancia con
+# un grupo con nombre por categoría: un único escaneo por turno y el debug
+# sabe qué categoría ha coincidido (match.lastgroup).
+_TOOL_PATTERNS: Dict[str, Tuple[str, ...]] = {
+    "shell": (
+        r'\b(ejecuta|corre|run|shell|terminal|comando)\b',
+        r'\b(lista|ls|dir|muestra.*archivo|muestra.*carpeta)\b',
+        r'\b(git|npm|pip|brew|docker)\b',
+    ),
+    "archivos": (
+        r'\b(crea.*archivo|escribe.*archivo|lee.*archivo)\b',
+        r'\b(abre.*carpeta|abre.*directorio)\b',
+        r'\b(borra|elimina|delete).*\b(archivo|carpeta)\b',
+    ),
+    "apps": (
+        r'\b(abre|open|lanza|launch|inicia|arranca)\b',
+        r'\b(spotify|chrome|safari|vscode|visual studio|finder|mail|calendar|notes)\b',
+    ),
+    "codigo": (
+        r'\b(ejecuta.*código|corre.*script|run.*code)\b',
+        r'\b(python|node|javascript).*script\b',
+    ),
+    "web": (
+        r'\b(busca.*en.*web|busca.*internet|search.*web)\b',
+        r'\b(encuentra.*información.*sobre|investiga.*sobre)\b',
+    ),
+    "spotify": (
+        r'\b(pon.*música|reproduce|pausa|siguiente.*canción|canción.*anterior)\b',
+        r'\b(sube.*volumen|baja.*volumen|qué.*está.*sonando)\b',
+    ),
+    "calendario": (
+        r'\b(qué.*tengo.*hoy|qué.*tengo.*mañana|eventos.*de)\b',
+        r'\b(crea.*recordatorio|añade.*recordatorio)\b',
+    ),
+    "email": (
+        r'\b(envía.*email|manda.*correo|envía.*mensaje)\b',
+    ),
+    "vision": (
+        r'\b(qué.*hay.*en.*pantalla|describe.*pantalla|mira.*pantalla)\b',
+        r'\b(lee.*pantalla|lee.*esto|transcribe.*pantalla)\b',
+        r'\b(captura.*pantalla|screenshot|haz.*captura)\b',
+        r'\b(qué.*ves|puedes.*ver|analiza.*imagen)\b',
+        r'\b(qué.*dice.*en.*pantalla|qué.*texto.*hay)\b',
+        r'\b(mira.*esto|observa.*esto|fíjate.*en)\b',
+    ),
+    "conocimiento": (
+        r'\b(aprende|guarda.*conocimiento|añade.*conocimiento|recuerda.*esto)\b',
+        r'\b(busca.*en.*conocimiento|qué.*sabes.*sobre|consulta.*conocimiento)\b',
+        r'\b(añade.*tutorial|guarda.*tutorial|aprende.*tutorial)\b',
+        r'\b(añade.*código|guarda.*código|guarda.*snippet)\b',
+        r'\b(lista.*conocimiento|muestra.*conocimiento|qué.*has.*aprendido)\b',
+    ),
+}
+_TOOL_RE = re.compile(
+    "|".join(
+        f"(?P<{category}>" + "|".join(f"(?:{p})" for p in patterns) + ")"
+        for category, patterns in _TOOL_PATTERNS.items()
+    ),
+    re.IGNORECASE,
+)
+
+
+def _trigger_stems(patterns: Dict[str, Tuple[str, ...]]) -> Tuple[str, ...]:
+    """
+    Palabras con las que empieza cada alternativa de los patrones.
+
+    Todos los patrones son r'\b(alt1|alt2...)...': cualquier coincidencia
+    empieza en una palabra del texto que comienza por uno de estos prefijos.
+    """
+    stems = set()
+    for group in patterns.values():
+        for pattern in group:
+            body = pattern[len(r'\b('):pattern.index(')')]
+            for alternative in body.split("|"):
+                stems.add(re.match(r"\w+", alternative).group(0).lower())
+    return tuple(sorted(stems))
+
+
+# Prefiltro barato: si ninguna palabra del texto empieza por un trigger no
+# hace falta el regex (la conversación pura es el caso habitual)
+_TRIGGER_STEMS = _trigger_stems(_TOOL_PATTERNS)
+_WORD_RE = re.compile(r"\w+")
+
+
+def _build_trigger_automaton(stems: Tuple[str, ...]) -> Any:
+    """Autómata Aho-Corasick de los triggers (None si no hay pyahocorasick)."""
+    try:
+        import ahocorasick
+    except ImportError:  # opcional: se usa el recorrido por palabras
+        return None
+    automaton = ahocorasick.Automaton()
+    for stem in stems:
+        automaton.add_word(stem, stem)
+    automaton.make_automaton()
+    return automaton
+
+
+_TRIGGER_AUTOMATON = _build_trigger_automaton(_TRIGGER_STEMS)
+
+
+def _has_trigger(text_lower: str) -> bool:
+    """
+    ¿Aparece algún trigger en el texto?
+
+    Con pyahocorasick es una sola pasada lineal en C; puede dar positivos
+    dentro de palabras, pero es solo un prefiltro y el regex confirma.
+    """
+    if _TRIGGER_AUTOMATON is not None:
+        return next(_TRIGGER_AUTOMATON.iter(text_lower), None) is not None
+    return any(word.startswith(_TRIGGER_STEMS) for word in _WORD_RE.findall(text_lower))
+
+# Solo se analiza el principio del texto (y un trozo del final): con logs o
+# documentos pegados el regex sobre todo el texto es puro coste, y la orden
+# casi siempre está en la primera frase
+_SCAN_HEAD = 4096
+_SCAN_TAIL = 256
+
+
+def _scan_window(text: str) -> str:
+    """Cabeza + cola del texto, acotando el coste de la detección."""
+    if len(text) <= _SCAN_HEAD + _SCAN_TAIL:
+        return text
+    return text[:_SCAN_HEAD] + "\n" + text[-_SCAN_TAIL:]
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Por encima de esta temperatura no se cachean respuestas: se espera variedad
+_CACHE_MAX_TEMPERATURE = 0.3
+
+# Mensajes previos que forman el contexto de la caché semántica
+_CACHE_CONTEXT_MESSAGES = 6
+
+# Atajos sin LLM para órdenes cortas e inequívocas:
+# (regex anclada sobre el texto normalizado, tool, extractor de argumentos)
+_APP_NAMES = {
+    "spotify": "Spotify",
+    "safari": "Safari",
+    "chrome": "Google Chrome",
+    "finder": "Finder",
+    "mail": "Mail",
+    "notas": "Notes",
+    "notes": "Notes",
+    "calendario": "Calendar",
+    "calendar": "Calendar",
+    "terminal": "Terminal",
+    "vscode": "Visual Studio Code",
+    "visual studio code": "Visual Studio Code",
+}
+
+# Sufijo opcional "en spotify" para las órdenes de música
+_IN_SPOTIFY = r"(?: en spotify)?"
+
+_FAST_PATHS: Tuple[Tuple[re.Pattern, str, Callable[[re.Match], Dict[str, Any]]], ...] = (
+    # Spotify. "siguiente", "anterior" o "play" sueltos no bastan ("la
+    # siguiente pregunta", "vuelve a la anterior"): hace falta una palabra
+    # que ancle la orden a la música (canción, música, spotify)
+    (
+        re.compile(r"(?:pon|reproduce|play|dale al play) (?:la )?(?:música|musica)" + _IN_SPOTIFY),
+        "spotify",
+        lambda m: {"action": "play"},
+    ),
+    (re.compile(r"(?:play|reproduce) (?:en )?spotify"), "spotify", lambda m: {"action": "play"}),
+    (re.compile(r"(?:pausa|para la música|para la musica|pause)" + _IN_SPOTIFY), "spotify", lambda m: {"action": "pause"}),
+    (
+        re.compile(r"(?:siguiente|next|pasa (?:a )?la siguiente|salta (?:la|esta)) (?:canción|cancion|tema)" + _IN_SPOTIFY),
+        "spotify",
+        lambda m: {"action": "next"},
+    ),
+    (
+        re.compile(r"(?:pon (?:la )?)?(?:canción|cancion|tema) anterior" + _IN_SPOTIFY),
+        "spotify",
+        lambda m: {"action": "previous"},
+    ),
+    (re.compile(r"sube (?:el )?volumen"), "spotify", lambda m: {"action": "volume_up"}),
+    (re.compile(r"baja (?:el )?volumen"), "spotify", lambda m: {"action": "volume_down"}),
+    (re.compile(r"qué (?:está sonando|suena)"), "spotify", lambda m: {"action": "status"}),
+    # Apps
+    (
+        re.compile(r"(?:abre|lanza|open) (?P<app>" + "|".join(map(re.escape, _APP_NAMES)) + ")"),
+        "open_app",
+        lambda m: {"app": _APP_NAMES[m.group("app")]},
+    ),
+    # Calendario
+    (re.compile(r"qué tengo hoy"), "calendar", lambda m: {"action": "today"}),
+    (re.compile(r"qué tengo mañana"), "calendar", lambda m: {"action": "tomorrow"}),
+)
+
+# Signos que se ignoran alrededor de una orden corta ("¿Qué tengo hoy?")
+_FAST_PATH_STRIP = " ¿?¡!.,"
+
+
+def _format_fast_reply(tool_out: Dict[str, Any]) -> str:
+    """Respuesta breve a partir de la salida de una tool (sin LLM)."""
+    if tool_out.get("error"):
+        return f"❌ {tool_out['error']}"
+    if tool_out.get("result"):
+        return str(tool_out["result"])
+    if tool_out.get("returncode", 0) != 0:
+        return f"❌ {tool_out.get('stderr') or 'Error ejecutando la acción'}"
+    return "✅ Hecho."
+
+
+# Pool compartido para ejecutar en paralelo las tool_calls de un turno.
+# Vive lo que el proceso: no se crean ni destruyen hilos en cada turno.
+_MAX_TOOL_WORKERS = 8
+_TOOL_POOL = ThreadPoolExecutor(max_workers=_MAX_TOOL_WORKERS, thread_name_prefix="jarvis-tool")
+
+
+def _get_http_session() -> Any:
+    """
+    Sesión HTTP (requests.Session) compartida del proceso.
+
+    Reutiliza las conexiones TCP a Ollama entre iteraciones del tool loop,
+    turnos y agentes en vez de abrir una por petición. requests se importa
+    aquí: importar el agente no lo carga.
+    """
+    global _HTTP_SESSION
+    with _HTTP_SESSION_LOCK:
+        if _HTTP_SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.headers["Connection"] = "keep-alive"
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _HTTP_SESSION = session
+        return _HTTP_SESSION
+
+
+def _get_groq_client(api_key: str) -> Any:
+    """Devuelve el cliente Groq para api_key, creándolo la primera vez."""
+    with _GROQ_CLIENTS_LOCK:
+        client = _GROQ_CLIENTS.get(api_key)
+        if client is None:
+            from groq import Groq
+            client = _GROQ_CLIENTS[api_key] = Groq(api_key=api_key)
+        return client
+
 
 @dataclass
 class ToolAgentConfig(AgentConfig):
     max_tool_loops: int = 6
     ollama_url: str = "http://localhost:11434"
     ollama_model: str = "llama3.2:3b"
+    # Mantener el modelo cargado entre turnos y con una forma de contexto fija
+    ollama_keep_alive: str = "30m"
+    ollama_num_ctx: int = 4096
+    ollama_num_batch: int = 512
+    # Cargar el modelo en segundo plano al crear el agente (red: lo activa
+    # tool_agent_from_settings, no una construcción sin más)
+    ollama_warmup: bool = False
+    # Dejar de leer la respuesta en cuanto llegan las tool_calls. Desactivar
+    # con servidores que emiten cada tool_call en un chunk distinto.
+    ollama_stop_on_tool_calls: bool = True
     use_groq: bool = False
     groq_api_key: str = ""
     groq_model: str = "llama-3.3-70b-versatile"
+    groq_temperature: float = 0.7
+    # Caché exacta de respuestas de Groq (solo con temperatura <= 0.3)
+    response_cache_size: int = 512
+    response_cache_ttl: float = 3600.0
     session_id: Optional[str] = None
     enable_memory: bool = True
+    # Presupuesto de contexto (system + historial) por llamada, en tokens estimados
+    max_context_tokens: int = 4000
+    # Mensajes que guarda el historial en RAM (si el agente crea su AgentState)
+    max_history_messages: int = 40
+    # Ejecutar órdenes cortas conocidas directamente, sin pasar por el LLM
+    enable_fast_path: bool = True
+    # Callback opcional por fragmento de texto (para empezar TTS/UI antes)
+    on_token: Optional[Callable[[str], None]] = None
 
 
 class ToolAgent:
@@ -40,116 +331,117 @@ class ToolAgent:
         registry: Optional[ToolRegistry] = None,
         state: Optional[AgentState] = None,
         memory_store: Optional[Any] = None,
+        llm_cache: Optional[Any] = None,
     ):
         self.config = config
         self.registry = registry or build_default_registry()
-        self.state = state or AgentState()
+        # AgentState define __len__: un estado vacío es falsy, no usar `or`
+        self.state = state if state is not None else AgentState(max_messages=self.config.max_history_messages)
         self.memory_store = memory_store
+        # Caché semántica opcional (LLMSemanticCache) para turnos sin tools
+        self.llm_cache = llm_cache
+        
+        # Schema de tools para Ollama, reconstruido solo si cambia el registro
+        # (otro objeto registro, o el mismo con tools nuevas)
+        self._tools_cache: Optional[List[Dict[str, Any]]] = None
+        self._tools_cache_key: Optional[Tuple[ToolRegistry, int]] = None
+        
+        self._resp_cache = ResponseCache(
+            maxsize=self.config.response_cache_size,
+            ttl=self.config.response_cache_ttl,
+        )
+        
+        # Tool calls idénticas en curso: la segunda espera el resultado de la primera
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # run_async ejecuta turnos en hilos: el estado solo admite uno a la vez
+        self._turn_lock = threading.Lock()
+        
+        if self.config.ollama_warmup:
+            threading.Thread(
+                target=self._warmup_ollama,
+                name="jarvis-ollama-warmup",
+                daemon=True,
+            ).start()
         
         if self.memory_store and self.config.enable_memory and not self.config.session_id:
             self.config.session_id = self.memory_store.create_session()
             if self.config.debug:
                 print(f"📝 Nueva sesión: {self.config.session_id[:8]}...")
         
-        self.groq_client = None
-        if self.config.use_groq and self.config.groq_api_key:
+        # Los INSERT en SQLite se hacen en un hilo aparte, fuera del turno
+        self._memory_writer: Optional[MemoryWriter] = None
+        if self.memory_store and self.config.enable_memory:
+            self._memory_writer = MemoryWriter(self.memory_store, debug=self.config.debug)
+        
+        # El cliente Groq (httpx + TLS) se crea en el primer turno que lo use
+        self._groq_client: Any = None
+        self._groq_enabled = bool(self.config.use_groq and self.config.groq_api_key)
+        if self._groq_enabled and self.config.debug:
+            print("✅ Modo Híbrido: Groq + Ollama + Visión")
+            if self.memory_store:
+                print("✅ Memoria persistente activada")
+
+    @property
+    def _http(self) -> Any:
+        """Sesión HTTP compartida hacia Ollama (creada en la primera petición)."""
+        return _get_http_session()
+
+    @property
+    def groq_client(self) -> Any:
+        """Cliente Groq compartido, o None si no está configurado/instalado."""
+        if self._groq_client is None and self._groq_enabled:
             try:
-                from groq import Groq
-                self.groq_client = Groq(api_key=self.config.groq_api_key)
-                if self.config.debug:
-                    print("✅ Modo Híbrido: Groq + Ollama + Visión")
-                    if self.memory_store:
-                        print("✅ Memoria persistente activada")
+                self._groq_client = _get_groq_client(self.config.groq_api_key)
             except ImportError:
                 print("⚠️ Librería 'groq' no instalada. Usando Ollama.")
-                self.groq_client = None
+                self._groq_enabled = False
+        return self._groq_client
 
     def _save_message(self, role: str, content: str) -> None:
-        """Guarda mensaje en memoria."""
-        if self.memory_store and self.config.enable_memory and self.config.session_id:
-            try:
-                self.memory_store.add_message(
-                    session_id=self.config.session_id,
-                    role=role,
-                    content=content
-                )
-            except Exception as e:
-                if self.config.debug:
-                    print(f"⚠️ Error guardando mensaje: {e}")
+        """Guarda mensaje en memoria (en segundo plano)."""
+        if self._memory_writer and self.config.session_id:
+            self._memory_writer.add_message(
+                session_id=self.config.session_id,
+                role=role,
+                content=content
+            )
 
     def _save_tool_event(self, tool_name: str, tool_args: Dict, tool_result: Dict) -> None:
-        """Guarda evento de herramienta."""
-        if self.memory_store and self.config.enable_memory and self.config.session_id:
-            try:
-                self.memory_store.add_tool_event(
-                    session_id=self.config.session_id,
-                    tool_name=tool_name,
-                    tool_args=tool_args,
-                    tool_result=tool_result
-                )
-            except Exception as e:
-                if self.config.debug:
-                    print(f"⚠️ Error guardando tool event: {e}")
+        """Guarda evento de herramienta (en segundo plano)."""
+        if self._memory_writer and self.config.session_id:
+            self._memory_writer.add_tool_event(
+                session_id=self.config.session_id,
+                tool_name=tool_name,
+                tool_args=tool_args,
+                tool_result=tool_result
+            )
+
+    def flush_memory(self) -> None:
+        """Espera a que la memoria pendiente esté escrita (antes de leerla)."""
+        if self._memory_writer:
+            self._memory_writer.flush()
+
+    def close(self) -> None:
+        """Escribe la memoria pendiente (la sesión HTTP es compartida)."""
+        if self._memory_writer:
+            self._memory_writer.close()
 
     def _needs_tools(self, user_text: str) -> bool:
         """Detecta si necesita herramientas."""
-        text_lower = user_text.lower()
-        
-        tool_patterns = [
-            # Comandos/Shell
-            r'\b(ejecuta|corre|run|shell|terminal|comando)\b',
-            r'\b(lista|ls|dir|muestra.*archivo|muestra.*carpeta)\b',
-            r'\b(git|npm|pip|brew|docker)\b',
-            
-            # Archivos
-            r'\b(crea.*archivo|escribe.*archivo|lee.*archivo)\b',
-            r'\b(abre.*carpeta|abre.*directorio)\b',
-            r'\b(borra|elimina|delete).*\b(archivo|carpeta)\b',
-            
-            # Apps - MEJORADO
-            r'\b(abre|open|lanza|launch|inicia|arranca)\b',
-            r'\b(spotify|chrome|safari|vscode|visual studio|finder|mail|calendar|notes)\b',
-            
-            # Código
-            r'\b(ejecuta.*código|corre.*script|run.*code)\b',
-            r'\b(python|node|javascript).*script\b',
-            
-            # Web search
-            r'\b(busca.*en.*web|busca.*internet|search.*web)\b',
-            r'\b(encuentra.*información.*sobre|investiga.*sobre)\b',
-            
-            # Spotify
-            r'\b(pon.*música|reproduce|pausa|siguiente.*canción|canción.*anterior)\b',
-            r'\b(sube.*volumen|baja.*volumen|qué.*está.*sonando)\b',
-            
-            # Calendario
-            r'\b(qué.*tengo.*hoy|qué.*tengo.*mañana|eventos.*de)\b',
-            r'\b(crea.*recordatorio|añade.*recordatorio)\b',
-            
-            # Email
-            r'\b(envía.*email|manda.*correo|envía.*mensaje)\b',
-            
-            # VISIÓN (NUEVO)
-            r'\b(qué.*hay.*en.*pantalla|describe.*pantalla|mira.*pantalla)\b',
-            r'\b(lee.*pantalla|lee.*esto|transcribe.*pantalla)\b',
-            r'\b(captura.*pantalla|screenshot|haz.*captura)\b',
-            r'\b(qué.*ves|puedes.*ver|analiza.*imagen)\b',
-            r'\b(qué.*dice.*en.*pantalla|qué.*texto.*hay)\b',
-            r'\b(mira.*esto|observa.*esto|fíjate.*en)\b',
-	    # KNOWLEDGE BASE (NUEVO)
-            r'\b(aprende|guarda.*conocimiento|añade.*conocimiento|recuerda.*esto)\b',
-            r'\b(busca.*en.*conocimiento|qué.*sabes.*sobre|consulta.*conocimiento)\b',
-            r'\b(añade.*tutorial|guarda.*tutorial|aprende.*tutorial)\b',
-            r'\b(añade.*código|guarda.*código|guarda.*snippet)\b',
-            r'\b(lista.*conocimiento|muestra.*conocimiento|qué.*has.*aprendido)\b',
-        ]
-        
-        for pattern in tool_patterns:
-            if re.search(pattern, text_lower):
-                if self.config.debug:
-                    print(f"🔧 Patrón herramienta: '{pattern}'")
-                    print("→ Usando Ollama (tools)")
-                return True
+        scan_text = _scan_window(user_text)
+        match = None
+        # El prefiltro necesita el texto en minúsculas: se copia solo la
+        # ventana acotada (como mucho _SCAN_HEAD + _SCAN_TAIL caracteres).
+        # El regex es IGNORECASE y va sobre la ventana original
+        if _has_trigger(scan_text.lower()):
+            match = _TOOL_RE.search(scan_text)
+        if match:
+            if self.config.debug:
+                print(f"🔧 Patrón herramienta [{match.lastgroup}]: '{match.group(0)}'")
+                print("→ Usando Ollama (tools)")
+            return True
         
         if self.config.debug:
             print("💭 Conversación pura")
@@ -157,67 +449,100 @@ class ToolAgent:
         return False
 
     def _tools_for_ollama(self) -> List[Dict[str, Any]]:
-        """Schema de tools para Ollama."""
-        tools: List[Dict[str, Any]] = []
-        
-        for name, spec in self.registry.list().items():
-            properties: Dict[str, Any] = {}
-            required: List[str] = []
-
-            for field_name, desc in (spec.schema or {}).items():
-                desc_str = str(desc)
-                ftype = "string"
-                if "int" in desc_str.lower():
-                    ftype = "integer"
-                elif "bool" in desc_str.lower():
-                    ftype = "boolean"
-                
-                properties[field_name] = {
-                    "type": ftype,
-                    "description": desc_str,
-                }
-                
-                if "obligatorio" in desc_str.lower():
-                    required.append(field_name)
-
-            parameters = {
-                "type": "object",
-                "properties": properties,
-                "required": required,
-            } if properties else {"type": "object"}
-
-            tools.append({
-                "type": "function",
-                "function": {
-                    "name": spec.name,
-                    "description": spec.description,
-                    "parameters": parameters,
-                },
-            })
+        """Schema de tools para Ollama (cacheado por versión del registro)."""
+        cache_key = self._tools_cache_key
+        if (
+            self._tools_cache is not None
+            and cache_key is not None
+            and cache_key[0] is self.registry
+            and cache_key[1] == self.registry.version
+        ):
+            return self._tools_cache
+        
+        # Cada spec trae su schema precalculado en register()
+        tools = [
+            spec.ollama_schema or spec.build_ollama_schema()
+            for spec in self.registry.list().values()
+        ]
 
+        self._tools_cache = tools
+        self._tools_cache_key = (self.registry, self.registry.version)
         return tools
 
     def build_messages(self, user_text: str) -> List[Message]:
-        messages: List[Message] = [{"role": "system", "content": SYSTEM_PROMPT}]
-        messages.extend(self.state.history)
-        messages.append({"role": "user", "content": user_text})
-        return messages
+        """
+        System prompt + historial, en una sola reserva de lista.
+
+        run() ya ha añadido user_text al historial, así que no se vuelve a
+        añadir al final (antes el turno del usuario se enviaba duplicado).
+        Se devuelve siempre una lista nueva: el bucle de tools le añade
+        mensajes intermedios que no deben acabar en self.state.
+        """
+        self._trim_history()
+        return [_SYSTEM_MESSAGE, *self.state.history]
+
+    def _trim_history(self) -> None:
+        """
+        Mantiene el historial dentro de max_context_tokens.
+        
+        Al pasarse se recorta hasta la mitad del presupuesto de una vez, no
+        mensaje a mensaje: el prefijo enviado vuelve a ser estable durante
+        varios turnos. El historial completo sigue en MemoryStore.
+        """
+        budget = self.config.max_context_tokens - _SYSTEM_TOKENS
+        if self.state.token_estimate() <= budget:
+            return
+        
+        dropped = self.state.trim_to_tokens(budget // 2)
+        if dropped and self.config.debug:
+            print(f"✂️ Historial recortado: {dropped} mensajes antiguos")
+
+    def _stream_groq(self, messages: List[Message]) -> Iterator[str]:
+        """Genera los fragmentos de texto de Groq según van llegando."""
+        stream = self.groq_client.chat.completions.create(
+            model=self.config.groq_model,
+            messages=messages,
+            max_tokens=2000,
+            temperature=self.config.groq_temperature,
+            stream=True,
+        )
+        on_token = self.config.on_token
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if on_token:
+                    on_token(delta)
+                yield delta
 
     def _run_with_groq(self, user_text: str) -> str:
         """Groq para conversación pura."""
         messages = self.build_messages(user_text)
 
-        try:
-            response = self.groq_client.chat.completions.create(
-                model=self.config.groq_model,
-                messages=messages,
-                max_tokens=2000,
-                temperature=0.7,
+        cache_key = None
+        if self.config.groq_temperature <= _CACHE_MAX_TEMPERATURE:
+            cache_key = ResponseCache.make_key(
+                self.config.groq_model, self.config.groq_temperature, messages
             )
-            
-            choice = response.choices[0]
-            msg = choice.message
-            final_text = (msg.content or "").strip() or "No generé respuesta."
+            cached = self._resp_cache.get(cache_key)
+            if cached is not None:
+                if self.config.debug:
+                    print("⚡ Respuesta desde caché")
+                if self.config.on_token:
+                    self.config.on_token(cached)
+                self.state.add_assistant(cached)
+                self._save_message("assistant", cached)
+                return cached
+
+        try:
+            # Un solo join al final en vez de concatenar texto token a token
+            text = "".join(self._stream_groq(messages))
+            final_text = text.strip() or "No generé respuesta."
+            if cache_key is not None and text.strip():
+                self._resp_cache.put(cache_key, final_text)
+            if text.strip():
+                self._remember_reply(user_text, final_text)
             self.state.add_assistant(final_text)
             self._save_message("assistant", final_text)
             return final_text
@@ -228,26 +553,229 @@ class ToolAgent:
                 print("→ Fallback a Ollama")
             return self._run_with_ollama(user_text, use_tools=False)
 
+    def _cache_context(self) -> str:
+        """
+        Digest de la conversación previa al turno actual, para la caché
+        semántica: "¿y mañana?" solo reutiliza una respuesta dada con el
+        mismo contexto detrás. Vacío si es el primer turno.
+        """
+        history = self.state.get_messages()
+        # El último mensaje es el del usuario en este turno
+        end = len(history) - 1
+        previous = list(islice(history, max(0, end - _CACHE_CONTEXT_MESSAGES), max(0, end)))
+        if not previous:
+            return ""
+        digest = hashlib.blake2b(digest_size=16)
+        for msg in previous:
+            digest.update(f"{msg.get('role')}\x1f{msg.get('content') or ''}\x1e".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _cached_reply(self, user_text: str) -> Optional[str]:
+        """Respuesta de la caché semántica para una pregunta parecida, o None."""
+        if self.llm_cache is None:
+            return None
+        try:
+            return self.llm_cache.get(user_text, context=self._cache_context())
+        except Exception as e:
+            if self.config.debug:
+                print(f"⚠️ Error caché semántica: {e}")
+            return None
+
+    def _remember_reply(self, user_text: str, reply: str) -> None:
+        """Guarda en la caché semántica una respuesta sin tools."""
+        if self.llm_cache is None:
+            return
+        try:
+            self.llm_cache.put(user_text, reply, context=self._cache_context())
+        except Exception as e:
+            if self.config.debug:
+                print(f"⚠️ Error caché semántica: {e}")
+
+    @staticmethod
+    def _extract_ollama_message(data: Dict[str, Any]) -> tuple[str, List[Dict[str, Any]]]:
+        """Extrae (content, tool_calls) de una respuesta de /api/chat."""
+        msg = data.get("message") or {}
+        return (msg.get("content") or "").strip(), msg.get("tool_calls") or []
+
+    def _exec_single_tool(self, tc: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """Parsea y ejecuta una tool_call. Devuelve (tool_name, tool_args, tool_out)."""
+        func = tc.get("function", {})
+        tool_name = func.get("name", "")
+        tool_args_raw = func.get("arguments", {})
+
+        # Ollama devuelve casi siempre un dict: ese caso no hace ningún trabajo
+        if isinstance(tool_args_raw, dict):
+            tool_args = tool_args_raw
+        elif isinstance(tool_args_raw, str):
+            try:
+                # orjson.JSONDecodeError y json.JSONDecodeError son ValueError
+                tool_args = _loads(tool_args_raw)
+            except ValueError:
+                tool_args = {"_raw": tool_args_raw}
+            if not isinstance(tool_args, dict):
+                tool_args = {"_raw": tool_args_raw}
+        else:
+            tool_args = {"_raw": str(tool_args_raw)}
+
+        if self.config.debug:
+            print(f"🔧 Ejecutando: {tool_name}")
+
+        tool_out = self._call_coalesced(tool_name, tool_args)
+        return tool_name, tool_args, tool_out
+
+    def _call_coalesced(self, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        registry.call() deduplicando llamadas idénticas simultáneas.
+        
+        Si el modelo pide dos veces lo mismo en el mismo turno (captura,
+        búsqueda web...) y la primera sigue en curso, la segunda reutiliza
+        su resultado. Las tools no thread-safe van en secuencia, así que
+        nunca coinciden en vuelo y se ejecutan cada vez.
+        """
+        try:
+            key = tool_name + "\0" + _dumps_sorted(tool_args)
+        except (TypeError, ValueError):
+            return self.registry.call(tool_name, tool_args)
+        
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        
+        if not owner:
+            if self.config.debug:
+                print(f"🔁 Reutilizando resultado en curso: {tool_name}")
+            return future.result()
+        
+        try:
+            result = self.registry.call(tool_name, tool_args)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _exec_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+        """
+        Ejecuta las tool_calls de un turno.
+        
+        Si hay varias y todas son thread-safe se lanzan en paralelo (latencia
+        max(tᵢ) en vez de Σ tᵢ). Los resultados vuelven en el orden emitido
+        por el modelo para que cada mensaje "tool" case con su llamada.
+        """
+        if len(tool_calls) > 1 and all(self._is_thread_safe(tc) for tc in tool_calls):
+            futures = [_TOOL_POOL.submit(self._exec_single_tool, tc) for tc in tool_calls]
+            return [f.result() for f in futures]
+
+        return [self._exec_single_tool(tc) for tc in tool_calls]
+
+    def _is_thread_safe(self, tc: Dict[str, Any]) -> bool:
+        spec = self.registry.get(tc.get("function", {}).get("name", ""))
+        # Una tool desconocida solo devuelve un error: no bloquea el paralelismo
+        return spec is None or spec.thread_safe
+
+    def _ollama_run_params(self) -> Dict[str, Any]:
+        """keep_alive y opciones comunes a todas las llamadas a Ollama."""
+        return {
+            "keep_alive": self.config.ollama_keep_alive,
+            "options": {
+                "num_ctx": self.config.ollama_num_ctx,
+                "num_batch": self.config.ollama_num_batch,
+                # Tokens del inicio del prompt (system) que Ollama conserva
+                # en su KV cache al desplazar el contexto
+                "num_keep": _SYSTEM_TOKENS,
+            },
+        }
+
+    def _warmup_ollama(self) -> None:
+        """
+        Pide a Ollama que cargue el modelo (prompt vacío) para que el
+        primer turno con tools no pague la carga en frío.
+
+        Va por la sesión compartida (self._http): la conexión que abre queda
+        en el pool y la reutiliza el primer turno.
+        """
+        import requests
+
+        try:
+            self._http.post(
+                f"{self.config.ollama_url}/api/generate",
+                data=_dumps_bytes({"model": self.config.ollama_model, **self._ollama_run_params()}),
+                headers=_JSON_HEADERS,
+                timeout=5,
+            )
+        except requests.RequestException as e:
+            # La carga sigue en Ollama aunque aquí venza el timeout
+            if self.config.debug:
+                print(f"⚠️ Warmup Ollama: {e}")
+
+    def _stream_ollama(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """POST a /api/chat en streaming: cada línea NDJSON es un chunk."""
+        with self._http.post(
+            f"{self.config.ollama_url}/api/chat",
+            data=_dumps_bytes({**payload, **self._ollama_run_params(), "stream": True}),
+            headers=_JSON_HEADERS,
+            stream=True,
+            timeout=120,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = _loads(line)
+                yield chunk
+                if chunk.get("done"):
+                    break
+
+    def _chat_ollama(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Llama a Ollama en streaming y devuelve la respuesta completa.
+        
+        El contenido se emite por config.on_token según llega; content y
+        tool_calls se acumulan entre chunks. Con ollama_stop_on_tool_calls
+        la lectura se corta en cuanto llega el chunk con las tool_calls (el
+        resto de la generación no se usa) y se cierra la conexión.
+        """
+        on_token = self.config.on_token
+        parts: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        
+        with closing(self._stream_ollama(payload)) as stream:
+            for chunk in stream:
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                
+                msg = chunk.get("message") or {}
+                piece = msg.get("content")
+                if piece:
+                    parts.append(piece)
+                    if on_token and not tool_calls:
+                        on_token(piece)
+                if msg.get("tool_calls"):
+                    tool_calls.extend(msg["tool_calls"])
+                    if self.config.ollama_stop_on_tool_calls:
+                        break
+        
+        return {"message": {"role": "assistant", "content": "".join(parts), "tool_calls": tool_calls}}
+
     def _run_with_ollama(self, user_text: str, use_tools: bool = True) -> str:
         """Ollama local con o sin tools."""
         messages = self.build_messages(user_text)
         
         if not use_tools:
             try:
-                response = requests.post(
-                    f"{self.config.ollama_url}/api/chat",
-                    json={
-                        "model": self.config.ollama_model,
-                        "messages": messages,
-                        "stream": False,
-                    },
-                    timeout=120,
-                )
-                response.raise_for_status()
-                data = response.json()
-                msg = data.get("message", {})
-                content = msg.get("content", "").strip()
+                data = self._chat_ollama({
+                    "model": self.config.ollama_model,
+                    "messages": messages,
+                })
+                content, _ = self._extract_ollama_message(data)
                 final_text = content or "No generé respuesta."
+                if content:
+                    self._remember_reply(user_text, final_text)
                 self.state.add_assistant(final_text)
                 self._save_message("assistant", final_text)
                 return final_text
@@ -262,18 +790,11 @@ class ToolAgent:
 
         for loop_count in range(self.config.max_tool_loops):
             try:
-                response = requests.post(
-                    f"{self.config.ollama_url}/api/chat",
-                    json={
-                        "model": self.config.ollama_model,
-                        "messages": messages,
-                        "tools": tools,
-                        "stream": False,
-                    },
-                    timeout=120,
-                )
-                response.raise_for_status()
-                data = response.json()
+                data = self._chat_ollama({
+                    "model": self.config.ollama_model,
+                    "messages": messages,
+                    "tools": tools,
+                })
                 
             except Exception as e:
                 err = f"Error Ollama: {e}"
@@ -281,9 +802,7 @@ class ToolAgent:
                 self._save_message("assistant", err)
                 return err
 
-            msg = data.get("message", {})
-            content = msg.get("content", "").strip()
-            tool_calls = msg.get("tool_calls", [])
+            content, tool_calls = self._extract_ollama_message(data)
 
             if not tool_calls:
                 final_text = content or "No generé respuesta."
@@ -297,28 +816,12 @@ class ToolAgent:
                 "tool_calls": tool_calls,
             })
 
-            for tc in tool_calls:
-                func = tc.get("function", {})
-                tool_name = func.get("name", "")
-                tool_args_raw = func.get("arguments", {})
-
-                if isinstance(tool_args_raw, str):
-                    try:
-                        tool_args = json.loads(tool_args_raw)
-                    except:
-                        tool_args = {"_raw": tool_args_raw}
-                else:
-                    tool_args = tool_args_raw
-
-                if self.config.debug:
-                    print(f"🔧 Ejecutando: {tool_name}")
-
-                tool_out = self.registry.call(tool_name, tool_args)
+            for tool_name, tool_args, tool_out in self._exec_tool_calls(tool_calls):
                 self._save_tool_event(tool_name, tool_args, tool_out)
 
                 messages.append({
                     "role": "tool",
-                    "content": json.dumps(tool_out, ensure_ascii=False),
+                    "content": _dumps(tool_out),
                 })
 
         msg = "Límite de tool loops alcanzado."
@@ -326,24 +829,109 @@ class ToolAgent:
         self._save_message("assistant", msg)
         return msg
 
+    def _try_fast_path(self, user_text: str) -> Optional[str]:
+        """
+        Atajo para órdenes inequívocas ("pausa", "abre spotify"...).
+        
+        Llama a la tool directamente y devuelve la respuesta, o None si el
+        texto no coincide con ningún atajo y hay que pasar por el LLM.
+        """
+        text = user_text.lower().strip(_FAST_PATH_STRIP)
+        for pattern, tool_name, extract_args in _FAST_PATHS:
+            match = pattern.fullmatch(text)
+            if match:
+                break
+        else:
+            return None
+        
+        tool_args = extract_args(match)
+        if self.config.debug:
+            print(f"⚡ Atajo: {tool_name} {tool_args}")
+        
+        tool_out = self.registry.call(tool_name, tool_args)
+        self._save_tool_event(tool_name, tool_args, tool_out)
+        
+        reply = _format_fast_reply(tool_out)
+        self.state.add_assistant(reply)
+        self._save_message("assistant", reply)
+        return reply
+
     def run(self, user_text: str) -> str:
         """Ejecuta petición con modo híbrido y memoria."""
-        user_text = (user_text or "").strip()
+        user_text = user_text.strip() if user_text else ""
         if not user_text:
             return "Dime qué quieres que haga."
 
         self.state.add_user(user_text)
         self._save_message("user", user_text)
 
+        if self.config.enable_fast_path:
+            reply = self._try_fast_path(user_text)
+            if reply is not None:
+                return reply
+
         needs_tools = self._needs_tools(user_text)
 
         if needs_tools:
             return self._run_with_ollama(user_text, use_tools=True)
+        
+        # Solo la conversación pura se cachea: un turno con tools tiene efectos
+        cached = self._cached_reply(user_text)
+        if cached is not None:
+            if self.config.debug:
+                print("⚡ Respuesta desde caché semántica")
+            self.state.add_assistant(cached)
+            self._save_message("assistant", cached)
+            return cached
+        
+        # _groq_enabled ya incluye use_groq y la API key: se mira antes de
+        # tocar la property para no pagarla en cada turno sin Groq
+        if self._groq_enabled and self.groq_client is not None:
+            return self._run_with_groq(user_text)
         else:
-            if self.groq_client and self.config.use_groq:
-                return self._run_with_groq(user_text)
-            else:
-                return self._run_with_ollama(user_text, use_tools=False)
+            return self._run_with_ollama(user_text, use_tools=False)
+
+    async def run_async(self, user_text: str) -> str:
+        """
+        Versión async de run() para servidores asyncio (web).
+        
+        El turno (HTTP a Groq/Ollama, tools, AppleScript) se ejecuta en un
+        hilo, así el event loop sigue atendiendo otras conexiones. Los
+        turnos sobre el mismo agente se serializan.
+        """
+        return await asyncio.to_thread(self._run_serialized, user_text)
+
+    def _run_serialized(self, user_text: str) -> str:
+        with self._turn_lock:
+            return self.run(user_text)
+
+    async def run_batch_async(self, texts: List[str], max_concurrency: int = 4) -> List[str]:
+        """
+        Procesa varias peticiones independientes a la vez (evals, lotes).
+        
+        Cada texto se ejecuta en un agente derivado con historial vacío y
+        sin memoria persistente, compartiendo registro y configuración, así
+        que las peticiones no se ven entre sí. El historial de este agente
+        no se modifica. Devuelve las respuestas en el mismo orden.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_one(text: str) -> str:
+            async with semaphore:
+                return await self._fork().run_async(text)
+        
+        return list(await asyncio.gather(*(run_one(t) for t in texts)))
+
+    def _fork(self) -> "ToolAgent":
+        """Agente independiente para una petición de un lote."""
+        config = replace(
+            self.config,
+            session_id=None,
+            enable_memory=False,
+            on_token=None,
+            ollama_warmup=False,
+        )
+        return ToolAgent(config, registry=self.registry)
 
 
 def tool_agent_from_settings(
@@ -352,6 +940,13 @@ def tool_agent_from_settings(
     memory_store: Optional[Any] = None,
 ) -> ToolAgent:
     """Construye ToolAgent desde Settings."""
+    from jarvis.tools.credentials import ToolSecrets, configure_tool_secrets
+    
+    # Las tools leen sus credenciales de esta instantánea, no del entorno
+    configure_tool_secrets(ToolSecrets(
+        groq_api_key=getattr(settings, "groq_api_key", "") or "",
+    ))
+    
     cfg = ToolAgentConfig(
         ollama_model=getattr(settings, "ollama_model", "llama3.2:3b"),
         use_groq=getattr(settings, "use_groq", False),
@@ -360,5 +955,18 @@ def tool_agent_from_settings(
         debug=bool(getattr(settings, "debug", False)),
         max_tool_loops=6,
         enable_memory=True,
+        ollama_warmup=True,
     )
-    return ToolAgent(cfg, registry=registry, memory_store=memory_store)
+    # Caché semántica (opcional, LLM_CACHE=true): necesita chromadb, y la
+    # colección no se abre hasta el primer turno que la consulta
+    llm_cache = None
+    if getattr(settings, "llm_cache", False):
+        from importlib.util import find_spec
+        
+        if find_spec("chromadb") is not None:
+            from jarvis.knowledge.llm_cache import LLMSemanticCache
+            llm_cache = LLMSemanticCache()
+        elif cfg.debug:
+            print("⚠️ Caché semántica desactivada: chromadb no está instalado")
+    
+    return ToolAgent(cfg, registry=registry, memory_store=memory_store, llm_cache=llm_cache)
@@ -48,6 +48,9 @@ class Settings(BaseSettings):
     groq_model: str = Field(default="llama-3.3-70b-versatile", alias="GROQ_MODEL")
     use_groq: bool = Field(default=False, alias="USE_GROQ")
 
+    # --- Caché semántica de respuestas (requiere chromadb) ---
+    llm_cache: bool = Field(default=False, alias="LLM_CACHE")
+
     # --- Ollama (local) ---
     ollama_model: str = Field(default="llama3.2:3b", alias="OLLAMA_MODEL")
 
@@ -0,0 +1,55 @@
+"""
+jsonutil.py
+
+(De)serialización JSON común a todo Jarvis.
+
+Usa orjson (C, emite bytes directamente) si está instalado y la librería
+estándar json si no. Ambas ramas producen JSON UTF-8 sin escapar acentos.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # opcional: json estándar como fallback
+    orjson = None
+
+
+__all__ = ["dumps", "dumps_bytes", "dumps_sorted", "loads"]
+
+
+if orjson is not None:
+    _OPTS = orjson.OPT_NON_STR_KEYS
+    _SORTED_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serializa a bytes (cuerpos HTTP)."""
+        return orjson.dumps(obj, option=_OPTS)
+
+    def dumps(obj: Any) -> str:
+        """Serializa a str (contenido de mensajes, columnas SQLite)."""
+        return orjson.dumps(obj, option=_OPTS).decode("utf-8")
+
+    def dumps_sorted(obj: Any) -> str:
+        """JSON canónico con claves ordenadas (para usar como clave)."""
+        return orjson.dumps(obj, option=_SORTED_OPTS).decode("utf-8")
+
+    loads = orjson.loads
+
+else:
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serializa a bytes (cuerpos HTTP)."""
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def dumps(obj: Any) -> str:
+        """Serializa a str (contenido de mensajes, columnas SQLite)."""
+        return json.dumps(obj, ensure_ascii=False)
+
+    def dumps_sorted(obj: Any) -> str:
+        """JSON canónico con claves ordenadas (para usar como clave)."""
+        return json.dumps(obj, ensure_ascii=False, sort_keys=True)
+
+    loads = json.loads
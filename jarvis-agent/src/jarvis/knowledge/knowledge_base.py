@@ -7,17 +7,58 @@ Permite a Jarvis recordar y consultar información técnica.
 
 from __future__ import annotations
 
+import importlib.util
+import os
+import re
+import threading
 import uuid
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-    from sentence_transformers import SentenceTransformer
-    CHROMADB_AVAILABLE = True
-except ImportError:
-    CHROMADB_AVAILABLE = False
+# chromadb (y su modelo de embeddings) tarda en importarse: solo se comprueba
+# que está instalado y se importa al crear la primera KnowledgeBase
+CHROMADB_AVAILABLE = importlib.util.find_spec("chromadb") is not None
+
+
+# Consultas distintas cuyo embedding se recuerda por instancia
+_QUERY_EMBED_CACHE_SIZE = 1024
+
+_TAG_CLEAN_RE = re.compile(r"\W+")
+
+# Un PersistentClient por directorio y proceso: crear varias KnowledgeBase
+# (o la caché semántica) sobre la misma ruta reutiliza el cliente en vez de
+# abrir otro SQLite sobre los mismos ficheros
+_CHROMA_CLIENTS: Dict[str, Any] = {}
+_CHROMA_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(path: str) -> Any:
+    """PersistentClient compartido para path."""
+    with _CHROMA_CLIENTS_LOCK:
+        client = _CHROMA_CLIENTS.get(path)
+        if client is None:
+            import chromadb
+            from chromadb.config import Settings
+            
+            if not os.path.isdir(path):
+                os.makedirs(path, exist_ok=True)
+            client = chromadb.PersistentClient(
+                path=path,
+                settings=Settings(anonymized_telemetry=False)
+            )
+            _CHROMA_CLIENTS[path] = client
+        return client
+
+
+def tag_key(tag: str) -> str:
+    """
+    Clave de metadato para un tag ("Async IO" -> "tag_async_io").
+    
+    Cada tag se guarda como su propia columna booleana para poder filtrar
+    con where={"tag_x": True} en vez de buscar dentro de un string.
+    """
+    return "tag_" + _TAG_CLEAN_RE.sub("_", tag.strip().lower()).strip("_")
 
 
 class KnowledgeBase:
@@ -31,25 +72,36 @@ class KnowledgeBase:
             persist_directory: Directorio donde persistir la base de datos
         """
         if not CHROMADB_AVAILABLE:
-            raise ImportError("ChromaDB no instalado. Ejecuta: pip3 install chromadb sentence-transformers")
+            raise ImportError("ChromaDB no instalado. Ejecuta: pip3 install chromadb")
+        
+        from chromadb.utils import embedding_functions
         
         self.persist_dir = Path(persist_directory).expanduser().resolve()
-        self.persist_dir.mkdir(parents=True, exist_ok=True)
         
-        # Inicializar ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=str(self.persist_dir),
-            settings=Settings(anonymized_telemetry=False)
-        )
+        # Inicializar ChromaDB (cliente compartido por directorio)
+        self.client = _get_client(str(self.persist_dir))
+        
+        # Embedder explícito (el mismo que usa Chroma por defecto) para poder
+        # cachear los embeddings de las consultas
+        self._embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+        self._embed_query = lru_cache(maxsize=_QUERY_EMBED_CACHE_SIZE)(self._embed_query_uncached)
         
         # Colección principal de conocimiento
-        self.collection = self.client.get_or_create_collection(
-            name="jarvis_knowledge",
-            metadata={"description": "Knowledge base for Jarvis assistant"}
-        )
+        self.collection = self._get_collection()
         
         print(f"📚 Knowledge base inicializada: {self.collection.count()} documentos")
     
+    def _get_collection(self):
+        """Colección principal, con el embedder de la instancia."""
+        return self.client.get_or_create_collection(
+            name="jarvis_knowledge",
+            metadata={"description": "Knowledge base for Jarvis assistant"},
+            embedding_function=self._embedding_fn
+        )
+    
+    def _embed_query_uncached(self, query: str) -> Tuple[float, ...]:
+        return tuple(float(x) for x in self._embedding_fn([query])[0])
+    
     def add_document(
         self,
         content: str,
@@ -67,25 +119,79 @@ class KnowledgeBase:
         Returns:
             ID del documento añadido
         """
-        if not content.strip():
+        return self.add_documents_bulk(
+            [content],
+            [metadata] if metadata else None,
+            [doc_id] if doc_id else None,
+        )[0]
+    
+    def add_documents_bulk(
+        self,
+        contents: List[str],
+        metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Añade varios documentos en una sola llamada a ChromaDB.
+        
+        Los embeddings se calculan en lote (una pasada del modelo para
+        todos) en vez de uno por documento.
+        
+        Args:
+            contents: Contenidos de los documentos
+            metadatas: Metadatos de cada documento (opcional)
+            ids: IDs personalizados (si no se proveen, se generan)
+        
+        Returns:
+            IDs de los documentos añadidos, en el mismo orden
+        """
+        if not contents:
+            return []
+        if any(not content.strip() for content in contents):
             raise ValueError("El contenido no puede estar vacío")
+        if metadatas is not None and len(metadatas) != len(contents):
+            raise ValueError("metadatas debe tener un elemento por documento")
+        if ids is not None and len(ids) != len(contents):
+            raise ValueError("ids debe tener un elemento por documento")
         
-        # Generar ID si no se provee
-        if not doc_id:
-            doc_id = str(uuid.uuid4())
+        # Generar IDs si no se proveen
+        doc_ids = list(ids) if ids else [str(uuid.uuid4()) for _ in contents]
         
         # Preparar metadatos
-        meta = metadata or {}
-        meta.setdefault("type", "general")
+        metas = [dict(meta or {}) for meta in metadatas] if metadatas else [{} for _ in contents]
+        for meta in metas:
+            meta.setdefault("type", "general")
         
         # Añadir a ChromaDB
         self.collection.add(
-            documents=[content],
-            metadatas=[meta],
-            ids=[doc_id]
+            documents=list(contents),
+            metadatas=metas,
+            ids=doc_ids
         )
         
-        return doc_id
+        return doc_ids
+    
+    @staticmethod
+    def _code_snippet_document(
+        code: str,
+        language: str,
+        description: str,
+        tags: Optional[List[str]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Contenido y metadatos de un snippet de código."""
+        content = f"{description}\n\nLenguaje: {language}\n\n```{language}\n{code}\n```"
+        
+        tags = [t for t in (tags or []) if t.strip()]
+        metadata = {
+            "type": "code",
+            "language": language,
+            "description": description,
+            # String legible (compatibilidad) + una columna por tag para filtrar
+            "tags": ",".join(tags),
+            **{tag_key(t): True for t in tags},
+        }
+        
+        return content, metadata
     
     def add_code_snippet(
         self,
@@ -106,16 +212,35 @@ class KnowledgeBase:
         Returns:
             ID del snippet
         """
-        content = f"{description}\n\nLenguaje: {language}\n\n```{language}\n{code}\n```"
+        content, metadata = self._code_snippet_document(code, language, description, tags)
+        return self.add_document(content, metadata)
+    
+    def add_code_snippets(self, snippets: List[Dict[str, Any]]) -> List[str]:
+        """
+        Añade varios snippets en lote.
         
-        metadata = {
-            "type": "code",
-            "language": language,
-            "description": description,
-            "tags": ",".join(tags) if tags else ""
-        }
+        Args:
+            snippets: Dicts con las claves de add_code_snippet
+                (code, language, description, tags)
         
-        return self.add_document(content, metadata)
+        Returns:
+            IDs de los snippets, en el mismo orden
+        """
+        documents = [self._code_snippet_document(**snippet) for snippet in snippets]
+        return self.add_documents_bulk(
+            [content for content, _ in documents],
+            [metadata for _, metadata in documents],
+        )
+    
+    @staticmethod
+    def _tutorial_metadata(title: str, category: str, source: Optional[str] = None) -> Dict[str, Any]:
+        """Metadatos de un tutorial."""
+        return {
+            "type": "tutorial",
+            "title": title,
+            "category": category,
+            "source": source or ""
+        }
     
     def add_tutorial(
         self,
@@ -136,20 +261,30 @@ class KnowledgeBase:
         Returns:
             ID del tutorial
         """
-        metadata = {
-            "type": "tutorial",
-            "title": title,
-            "category": category,
-            "source": source or ""
-        }
+        return self.add_document(content, self._tutorial_metadata(title, category, source))
+    
+    def add_tutorials(self, tutorials: List[Dict[str, Any]]) -> List[str]:
+        """
+        Añade varios tutoriales en lote.
         
-        return self.add_document(content, metadata)
+        Args:
+            tutorials: Dicts con las claves de add_tutorial
+                (title, content, category, source)
+        
+        Returns:
+            IDs de los tutoriales, en el mismo orden
+        """
+        return self.add_documents_bulk(
+            [t["content"] for t in tutorials],
+            [self._tutorial_metadata(t["title"], t["category"], t.get("source")) for t in tutorials],
+        )
     
     def search(
         self,
         query: str,
         n_results: int = 5,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        tags: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Busca documentos relevantes.
@@ -158,12 +293,21 @@ class KnowledgeBase:
             query: Consulta de búsqueda
             n_results: Número de resultados a retornar
             filter_metadata: Filtros opcionales (ej: {"type": "code"})
+            tags: Solo documentos con todos estos tags
         
         Returns:
             Lista de documentos relevantes con sus metadatos
         """
+        if tags:
+            conditions = [{tag_key(t): True} for t in tags]
+            if filter_metadata:
+                conditions.append(filter_metadata)
+            filter_metadata = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+        
+        # Consultas repetidas (reintentos del agente) no vuelven a pasar por el modelo
+        query_embedding = list(self._embed_query(query.strip().lower()))
         results = self.collection.query(
-            query_texts=[query],
+            query_embeddings=[query_embedding],
             n_results=n_results,
             where=filter_metadata
         )
@@ -182,25 +326,30 @@ class KnowledgeBase:
     
     def get_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene un documento por su ID."""
-        try:
-            result = self.collection.get(ids=[doc_id])
-            if result['ids']:
-                return {
-                    'id': result['ids'][0],
-                    'content': result['documents'][0],
-                    'metadata': result['metadatas'][0]
-                }
-            return None
-        except:
+        # get() no lanza con IDs inexistentes: devuelve listas vacías
+        result = self.collection.get(ids=[doc_id])
+        if not result['ids']:
             return None
+        return {
+            'id': result['ids'][0],
+            'content': result['documents'][0],
+            'metadata': result['metadatas'][0]
+        }
     
     def delete(self, doc_id: str) -> bool:
-        """Elimina un documento."""
-        try:
-            self.collection.delete(ids=[doc_id])
-            return True
-        except:
+        """
+        Elimina un documento.
+        
+        Returns:
+            False si no existe ningún documento con ese ID
+        """
+        # Comprobación explícita: ChromaDB no falla al borrar un ID que no
+        # existe. include=[] pide solo los IDs (sin documentos ni embeddings)
+        if not self.collection.get(ids=[doc_id], include=[])['ids']:
             return False
+        
+        self.collection.delete(ids=[doc_id])
+        return True
     
     def list_all(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Lista todos los documentos."""
@@ -216,6 +365,26 @@ class KnowledgeBase:
         
         return documents
     
+    def migrate_tag_columns(self) -> int:
+        """
+        Añade las columnas tag_<x> a snippets guardados solo con el string
+        "tags" (formato antiguo). Devuelve cuántos documentos se actualizan.
+        """
+        result = self.collection.get(where={"type": "code"}, include=["metadatas"])
+        
+        ids: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        for doc_id, meta in zip(result["ids"], result["metadatas"]):
+            tags = [t for t in str(meta.get("tags") or "").split(",") if t.strip()]
+            missing = {tag_key(t): True for t in tags if tag_key(t) not in meta}
+            if missing:
+                ids.append(doc_id)
+                metadatas.append({**meta, **missing})
+        
+        if ids:
+            self.collection.update(ids=ids, metadatas=metadatas)
+        return len(ids)
+    
     def count(self) -> int:
         """Retorna el número total de documentos."""
         return self.collection.count()
@@ -223,8 +392,5 @@ class KnowledgeBase:
     def clear_all(self) -> None:
         """⚠️ ELIMINA TODA LA BASE DE CONOCIMIENTO."""
         self.client.delete_collection("jarvis_knowledge")
-        self.collection = self.client.get_or_create_collection(
-            name="jarvis_knowledge",
-            metadata={"description": "Knowledge base for Jarvis assistant"}
-        )
+        self.collection = self._get_collection()
         print("🗑️ Base de conocimiento limpiada")
@@ -0,0 +1,119 @@
+"""
+llm_cache.py
+
+Caché semántica de respuestas del LLM sobre ChromaDB.
+
+Guarda (pregunta -> respuesta) en la colección "jarvis_llm_cache" del mismo
+cliente que KnowledgeBase. Una pregunta reformulada ("qué es docker" /
+"explícame docker") cae cerca en el espacio de embeddings y reutiliza la
+respuesta sin llamar al LLM.
+
+Cada entrada va ligada a un contexto (digest de la conversación previa): una
+pregunta que depende de lo anterior ("¿y mañana?") solo acierta con la
+misma conversación detrás, no en otra sin relación.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from jarvis.knowledge.knowledge_base import KnowledgeBase
+
+
+class LLMSemanticCache:
+    """
+    Caché semántica con caducidad.
+
+    - kb: KnowledgeBase cuyo cliente se usa; si es None se toma la instancia
+      compartida de la tool knowledge al primer uso (no al construir)
+    - threshold: distancia coseno máxima para considerar un acierto
+    - ttl: segundos que una respuesta se considera válida
+    """
+
+    COLLECTION = "jarvis_llm_cache"
+
+    # Cada cuántas escrituras se purgan las entradas caducadas
+    _PURGE_EVERY = 32
+
+    def __init__(
+        self,
+        kb: Optional[KnowledgeBase] = None,
+        threshold: float = 0.15,
+        ttl: float = 24 * 3600,
+    ) -> None:
+        self.threshold = threshold
+        self.ttl = ttl
+        self._kb = kb
+        self._collection: Any = None
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    @property
+    def collection(self) -> Any:
+        """Colección de ChromaDB (se abre la primera vez)."""
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    kb = self._kb
+                    if kb is None:
+                        from jarvis.tools.knowledge import get_knowledge_base
+
+                        kb = get_knowledge_base()
+                    self._collection = kb.client.get_or_create_collection(
+                        name=self.COLLECTION,
+                        metadata={"description": "LLM response cache for Jarvis", "hnsw:space": "cosine"},
+                    )
+        return self._collection
+
+    def get(self, query: str, context: str = "") -> Optional[str]:
+        """Devuelve la respuesta cacheada más parecida con el mismo contexto, o None."""
+        collection = self.collection
+        if not collection.count():
+            return None
+
+        results = collection.query(
+            query_texts=[query],
+            n_results=1,
+            where={"$and": [
+                {"context": context},
+                {"expires_at": {"$gt": time.time()}},
+            ]},
+        )
+        if not results["ids"][0]:
+            return None
+
+        distance = results["distances"][0][0]
+        if distance > self.threshold:
+            return None
+
+        return results["metadatas"][0][0].get("response")
+
+    def put(self, query: str, response: str, context: str = "") -> None:
+        """Guarda la respuesta a query (el embedding es el de la pregunta)."""
+        self.collection.add(
+            documents=[query],
+            metadatas=[{
+                "response": response,
+                "context": context,
+                "expires_at": time.time() + self.ttl,
+            }],
+            ids=[str(uuid.uuid4())],
+        )
+
+        self._puts += 1
+        if self._puts % self._PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def purge_expired(self) -> None:
+        """Elimina las entradas caducadas."""
+        self.collection.delete(where={"expires_at": {"$lt": time.time()}})
+
+    def clear(self) -> None:
+        """Vacía la caché."""
+        ids = self.collection.get()["ids"]
+        if ids:
+            self.collection.delete(ids=ids)
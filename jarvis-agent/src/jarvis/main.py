@@ -9,7 +9,8 @@ from __future__ import annotations
 import argparse
 from typing import Optional
 
-from jarvis.config import load_settings
+
+__all__ = ["build_arg_parser", "main"]
 
 
 def build_arg_parser() -> argparse.ArgumentParser:
@@ -47,6 +48,10 @@ def main(argv: Optional[list[str]] = None) -> int:
     parser = build_arg_parser()
     args = parser.parse_args(argv)
 
+    # Se importa tras parsear: `jarvis --help` (o un argumento inválido) no
+    # carga pydantic ni dotenv
+    from jarvis.config import load_settings
+
     settings, paths = load_settings()
 
     if args.debug:
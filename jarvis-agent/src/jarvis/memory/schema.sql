@@ -1,7 +1,7 @@
 -- schema.sql
 -- Base de datos SQLite para memoria persistente de Jarvis
 
-PRAGMA journal_mode=WAL;
+-- Los PRAGMA de la conexión (WAL, synchronous...) se aplican en MemoryStore
 
 CREATE TABLE IF NOT EXISTS sessions (
   id TEXT PRIMARY KEY,
@@ -25,4 +25,11 @@ CREATE TABLE IF NOT EXISTS tool_events (
   tool_result TEXT NOT NULL,   -- JSON string
   created_at TEXT NOT NULL,
   FOREIGN KEY(session_id) REFERENCES sessions(id)
-);
\ No newline at end of file
+);
+
+-- Índices para las consultas habituales (historial por sesión, búsquedas
+-- recientes y listado de sesiones)
+CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id, id);
+CREATE INDEX IF NOT EXISTS idx_messages_created ON messages(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_tool_events_session_id ON tool_events(session_id, id);
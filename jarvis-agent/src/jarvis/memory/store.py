@@ -6,43 +6,203 @@ Gestión de memoria persistente en SQLite.
 
 from __future__ import annotations
 
-import json
+import atexit
+import re
 import sqlite3
+import threading
 import uuid
-from datetime import datetime
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from jarvis.jsonutil import dumps
+
+
+# Ajustes de la conexión: WAL deja leer mientras se escribe y, con
+# synchronous=NORMAL, cada commit ya no hace fsync (solo los checkpoints)
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",   # 256 MiB
+    "PRAGMA cache_size=-20000",     # ~20 MB de caché de páginas
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_spill=OFF",       # la BD es pequeña: páginas siempre en RAM
+)
+
+# Marca de tiempo calculada por SQLite al insertar: hora local en ISO 8601
+# con milisegundos, el mismo formato que datetime.isoformat() usaba antes
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')"
+
+# Sentencias SQL: siempre el mismo texto, así sqlite3 reutiliza la sentencia
+# ya preparada de su caché en vez de volver a compilarla en cada llamada
+_SQL_CREATE_SESSION = f"""
+INSERT INTO sessions (id, created_at) VALUES (?, {_NOW})
+"""
+
+_SQL_ADD_MESSAGE = f"""
+INSERT INTO messages (session_id, role, content, created_at)
+VALUES (?, ?, ?, {_NOW})
+"""
+
+_SQL_ADD_TOOL_EVENT = f"""
+INSERT INTO tool_events (session_id, tool_name, tool_args, tool_result, created_at)
+VALUES (?, ?, ?, ?, {_NOW})
+"""
+
+_SQL_SESSION_MESSAGES = """
+SELECT role, content, created_at
+FROM messages
+WHERE session_id = ?
+ORDER BY id ASC
+"""
+
+_SQL_RECENT_SESSIONS = """
+SELECT s.id, s.created_at,
+       (SELECT COUNT(*) FROM messages m
+        WHERE m.session_id = s.id) as message_count
+FROM sessions s
+ORDER BY s.created_at DESC
+LIMIT ?
+"""
+
+# Índice de texto completo sobre messages.content (tabla FTS5 de contenido
+# externo, sincronizada por triggers). Va aparte de schema.sql porque no
+# todas las compilaciones de SQLite traen FTS5: sin ella se busca con LIKE.
+_SQL_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+  content,
+  content='messages',
+  content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+  INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+  INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE ON messages BEGIN
+  INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+  INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+_SQL_FTS_EXISTS = """
+SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'
+"""
+
+_FTS_TERM_RE = re.compile(r"\w+")
+
+# Índice creado sobre una BD que ya tenía mensajes: se rellena una vez
+_SQL_FTS_REBUILD = "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"
+
+_SQL_SEARCH_MESSAGES_FTS = """
+SELECT m.session_id, m.role, m.content, m.created_at
+FROM messages_fts f
+JOIN messages m ON m.id = f.rowid
+WHERE messages_fts MATCH ?
+ORDER BY bm25(messages_fts)
+LIMIT ?
+"""
+
+_SQL_SEARCH_MESSAGES = """
+SELECT m.session_id, m.role, m.content, m.created_at
+FROM messages m
+WHERE m.content LIKE ?
+ORDER BY m.created_at DESC
+LIMIT ?
+"""
 
 
 class MemoryStore:
-    """Store de memoria persistente."""
+    """
+    Store de memoria persistente.
+    
+    Mantiene una única conexión abierta durante toda la vida del store (en
+    vez de abrir y cerrar una por llamada), protegida con un RLock porque la
+    usan a la vez el hilo principal, MemoryWriter y el servidor web.
+    """
     
     def __init__(self, db_path: Path):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # isolation_level=None: autocommit, cada sentencia es su transacción
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            self._conn.execute(pragma)
+        self._lock = threading.RLock()
+        self._fts = False
+        
         self._init_db()
+        atexit.register(self.close)
     
     def _init_db(self) -> None:
         """Inicializa la base de datos con el schema."""
         schema_path = Path(__file__).parent / "schema.sql"
         
-        with sqlite3.connect(self.db_path) as conn:
-            with open(schema_path, 'r') as f:
-                conn.executescript(f.read())
-            conn.commit()
+        with open(schema_path, 'r') as f:
+            schema = f.read()
+        with self._lock:
+            self._conn.executescript(schema)
+            self._fts = self._init_fts()
+    
+    def _init_fts(self) -> bool:
+        """Crea el índice FTS5 si SQLite lo soporta. True si está disponible."""
+        try:
+            existed = self._conn.execute(_SQL_FTS_EXISTS).fetchone() is not None
+            self._conn.executescript(_SQL_FTS_SCHEMA)
+            if not existed:
+                self._conn.execute(_SQL_FTS_REBUILD)
+        except sqlite3.OperationalError:
+            # SQLite sin FTS5
+            return False
+        return True
+    
+    def close(self) -> None:
+        """Cierra la conexión (también se llama en atexit)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Agrupa varias escrituras en una sola transacción (un solo commit).
+        
+        Si ya hay una transacción abierta se une a ella.
+        """
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self._conn
+                return
+            
+            self._conn.execute("BEGIN")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
     
     def create_session(self) -> str:
         """Crea una nueva sesión y retorna su ID."""
+        # El ID se genera aquí, igual con cualquier versión de SQLite (mismo
+        # formato que las sesiones ya guardadas), y se liga como parámetro:
+        # un solo INSERT, sin consulta posterior
         session_id = str(uuid.uuid4())
-        timestamp = datetime.now().isoformat()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "INSERT INTO sessions (id, created_at) VALUES (?, ?)",
-                (session_id, timestamp)
-            )
-            conn.commit()
-        
+        with self._lock:
+            self._conn.execute(_SQL_CREATE_SESSION, (session_id,))
         return session_id
     
     def add_message(
@@ -52,17 +212,8 @@ class MemoryStore:
         content: str,
     ) -> None:
         """Añade un mensaje a la sesión."""
-        timestamp = datetime.now().isoformat()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                """
-                INSERT INTO messages (session_id, role, content, created_at)
-                VALUES (?, ?, ?, ?)
-                """,
-                (session_id, role, content, timestamp)
-            )
-            conn.commit()
+        with self._lock:
+            self._conn.execute(_SQL_ADD_MESSAGE, (session_id, role, content))
     
     def add_tool_event(
         self,
@@ -72,69 +223,74 @@ class MemoryStore:
         tool_result: Dict[str, Any],
     ) -> None:
         """Registra un evento de uso de herramienta."""
-        timestamp = datetime.now().isoformat()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                """
-                INSERT INTO tool_events 
-                (session_id, tool_name, tool_args, tool_result, created_at)
-                VALUES (?, ?, ?, ?, ?)
-                """,
+        with self._lock:
+            self._conn.execute(
+                _SQL_ADD_TOOL_EVENT,
                 (
                     session_id,
                     tool_name,
-                    json.dumps(tool_args),
-                    json.dumps(tool_result),
-                    timestamp
+                    dumps(tool_args),
+                    dumps(tool_result)
                 )
             )
-            conn.commit()
+    
+    def add_messages(
+        self,
+        session_id: str,
+        items: Iterable[Tuple[str, str]],
+    ) -> None:
+        """Añade varios mensajes (role, content) en una transacción."""
+        rows = [(session_id, role, content) for role, content in items]
+        if not rows:
+            return
+        
+        with self.transaction() as conn:
+            conn.executemany(_SQL_ADD_MESSAGE, rows)
+    
+    def add_tool_events(
+        self,
+        session_id: str,
+        events: Iterable[Tuple[str, Dict[str, Any], Dict[str, Any]]],
+    ) -> None:
+        """Registra varios eventos (tool_name, args, result) en una transacción."""
+        rows = [
+            (session_id, name, dumps(args), dumps(result))
+            for name, args, result in events
+        ]
+        if not rows:
+            return
+        
+        with self.transaction() as conn:
+            conn.executemany(_SQL_ADD_TOOL_EVENT, rows)
     
     def get_session_messages(self, session_id: str) -> List[Dict[str, Any]]:
         """Obtiene todos los mensajes de una sesión."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                """
-                SELECT role, content, created_at
-                FROM messages
-                WHERE session_id = ?
-                ORDER BY created_at ASC
-                """,
-                (session_id,)
-            )
+        with self._lock:
+            cursor = self._conn.execute(_SQL_SESSION_MESSAGES, (session_id,))
             return [dict(row) for row in cursor.fetchall()]
     
     def get_recent_sessions(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Obtiene las sesiones más recientes."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                """
-                SELECT s.id, s.created_at, COUNT(m.id) as message_count
-                FROM sessions s
-                LEFT JOIN messages m ON s.id = m.session_id
-                GROUP BY s.id
-                ORDER BY s.created_at DESC
-                LIMIT ?
-                """,
-                (limit,)
-            )
+        with self._lock:
+            cursor = self._conn.execute(_SQL_RECENT_SESSIONS, (limit,))
             return [dict(row) for row in cursor.fetchall()]
     
     def search_messages(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
-        """Busca mensajes que contengan el query."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                """
-                SELECT m.session_id, m.role, m.content, m.created_at
-                FROM messages m
-                WHERE m.content LIKE ?
-                ORDER BY m.created_at DESC
-                LIMIT ?
-                """,
-                (f"%{query}%", limit)
-            )
+        """
+        Busca mensajes que contengan el query.
+        
+        Con FTS5 los resultados van ordenados por relevancia (BM25) y cada
+        palabra del query se busca como prefijo; sin FTS5, LIKE por fecha.
+        """
+        terms = _FTS_TERM_RE.findall(query)
+        if self._fts and terms:
+            # Cada término entre comillas: el query del usuario nunca se
+            # interpreta como sintaxis FTS (AND, OR, NEAR, *, ...)
+            match = " ".join(f'"{term}"*' for term in terms)
+            with self._lock:
+                cursor = self._conn.execute(_SQL_SEARCH_MESSAGES_FTS, (match, limit))
+                return [dict(row) for row in cursor.fetchall()]
+        
+        with self._lock:
+            cursor = self._conn.execute(_SQL_SEARCH_MESSAGES, (f"%{query}%", limit))
             return [dict(row) for row in cursor.fetchall()]
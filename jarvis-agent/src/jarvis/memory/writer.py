@@ -0,0 +1,150 @@
+"""
+writer.py
+
+Escritura de memoria en segundo plano.
+
+MemoryWriter saca los INSERT de MemoryStore del camino crítico del agente:
+los mensajes y eventos de tools se encolan y un único hilo los escribe en
+orden, agrupando lo que llega en ráfagas (varios tool events por turno) en
+una sola transacción.
+"""
+
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from jarvis.memory.store import MemoryStore
+
+
+# Tamaño máximo de lote y tiempo que se espera a que llegue más trabajo
+_BATCH_SIZE = 32
+_BATCH_WAIT_SEC = 0.05
+
+# Marca de fin para el hilo escritor
+_STOP = object()
+
+_Item = Tuple[str, Dict[str, Any]]
+
+
+class MemoryWriter:
+    """
+    Cola de escritura asíncrona sobre un MemoryStore.
+
+    - add_message / add_tool_event: encolan y vuelven al instante
+    - flush(): espera a que todo lo encolado esté escrito
+    - close(): vacía la cola y para el hilo (también se llama en atexit)
+    """
+
+    def __init__(self, store: MemoryStore, debug: bool = False) -> None:
+        self.store = store
+        self.debug = debug
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="jarvis-memory-writer",
+            daemon=True,
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add_message(self, session_id: str, role: str, content: str) -> None:
+        """Encola un mensaje."""
+        self._submit(("message", {
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+        }))
+
+    def add_tool_event(
+        self,
+        session_id: str,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        tool_result: Dict[str, Any],
+    ) -> None:
+        """Encola un evento de herramienta."""
+        self._submit(("tool_event", {
+            "session_id": session_id,
+            "tool_name": tool_name,
+            "tool_args": tool_args,
+            "tool_result": tool_result,
+        }))
+
+    def flush(self) -> None:
+        """Bloquea hasta que todo lo encolado se haya escrito."""
+        if not self._closed:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Escribe lo pendiente y para el hilo."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _submit(self, item: _Item) -> None:
+        if self._closed:
+            # Tras close() ya no hay hilo: se escribe directamente
+            self._write(item)
+            return
+        self._queue.put(item)
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Any] = [self._queue.get()]
+
+            # Agrupa lo que llegue en los próximos milisegundos
+            deadline = time.monotonic() + _BATCH_WAIT_SEC
+            while len(batch) < _BATCH_SIZE and batch[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._write_batch([item for item in batch if item is not _STOP])
+            for _ in batch:
+                self._queue.task_done()
+
+            if batch[-1] is _STOP:
+                return
+
+    def _write_batch(self, items: List[_Item]) -> None:
+        """Escribe el lote en una sola transacción (un commit por ráfaga)."""
+        if not items:
+            return
+        if len(items) == 1:
+            self._write(items[0])
+            return
+        
+        try:
+            with self.store.transaction():
+                for kind, kwargs in items:
+                    if kind == "message":
+                        self.store.add_message(**kwargs)
+                    else:
+                        self.store.add_tool_event(**kwargs)
+        except Exception:
+            # Se ha deshecho el lote entero: se reintenta fila a fila para
+            # no perder las que sí son válidas
+            for item in items:
+                self._write(item)
+    
+    def _write(self, item: _Item) -> None:
+        kind, kwargs = item
+        try:
+            if kind == "message":
+                self.store.add_message(**kwargs)
+            else:
+                self.store.add_tool_event(**kwargs)
+        except Exception as e:
+            if self.debug:
+                print(f"⚠️ Error guardando {kind}: {e}")
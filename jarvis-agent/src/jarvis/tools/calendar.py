@@ -8,7 +8,75 @@ from __future__ import annotations
 
 import subprocess
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+from jarvis.tools.osascript import AppleScriptError, run_applescript
+
+
+# Rango [inicio del día + offset, + span días). El filtro "whose" se aplica
+# a los eventos de cada calendario (every event of every calendar whose...),
+# en una sola referencia de la que se leen start date y summary en bloque,
+# no evento a evento. Calendar devuelve una lista por calendario, que se
+# aplana ya en local.
+_EVENTS_SCRIPT = '''
+tell application "Calendar"
+    set rangeStart to current date
+    set time of rangeStart to 0
+    set rangeStart to rangeStart + ({offset} * days)
+    set rangeEnd to rangeStart + ({span} * days)
+    
+    set matching to a reference to (every event of every calendar whose start date ≥ rangeStart and start date < rangeEnd)
+    set eventStarts to start date of matching
+    set eventNames to summary of matching
+end tell
+
+set output to ""
+set eventCount to 0
+repeat with i from 1 to count of eventStarts
+    set calStarts to item i of eventStarts
+    set calNames to item i of eventNames
+    repeat with j from 1 to count of calStarts
+        set eventCount to eventCount + 1
+        set output to output & "  • " & (time string of item j of calStarts) & " - " & (item j of calNames) & "
+"
+    end repeat
+end repeat
+
+if eventCount = 0 then
+    return "{empty}"
+end if
+{result}
+'''
+
+_TODAY_SCRIPT = _EVENTS_SCRIPT.format(
+    offset=0, span=1,
+    empty="📅 No hay eventos hoy",
+    result='return "📅 Eventos de hoy:\n" & output',
+)
+_TOMORROW_SCRIPT = _EVENTS_SCRIPT.format(
+    offset=1, span=1,
+    empty="📅 No hay eventos mañana",
+    result='return "📅 Eventos de mañana:\n" & output',
+)
+_WEEK_SCRIPT = _EVENTS_SCRIPT.format(
+    offset=0, span=7,
+    empty="📅 No hay eventos esta semana",
+    result='return "📅 Eventos de esta semana: " & eventCount & " eventos\n"',
+)
+
+# El título llega como argumento: el script no cambia entre llamadas (se
+# compila una vez) y las comillas del título no pueden romperlo
+_CREATE_REMINDER_SCRIPT = '''
+on run argv
+    set reminderName to item 1 of argv
+    tell application "Reminders"
+        tell list "Reminders"
+            make new reminder with properties {name:reminderName}
+        end tell
+    end tell
+    return "✅ Recordatorio creado: " & reminderName
+end run
+'''
 
 
 def calendar_query(action: str = "today", query: str = "") -> Dict[str, Any]:
@@ -30,89 +98,16 @@ def calendar_query(action: str = "today", query: str = "") -> Dict[str, Any]:
     action = (action or "today").lower().strip()
     
     try:
+        args: List[str] = []
+        
         if action == "today":
-            script = '''
-            tell application "Calendar"
-                set todayStart to current date
-                set time of todayStart to 0
-                set todayEnd to todayStart + (1 * days)
-                
-                set eventList to {}
-                repeat with cal in calendars
-                    set calEvents to (every event of cal whose start date ≥ todayStart and start date < todayEnd)
-                    set eventList to eventList & calEvents
-                end repeat
-                
-                if (count of eventList) = 0 then
-                    return "📅 No hay eventos hoy"
-                end if
-                
-                set output to "📅 Eventos de hoy:
-"
-                repeat with evt in eventList
-                    set eventTime to time string of start date of evt
-                    set eventName to summary of evt
-                    set output to output & "  • " & eventTime & " - " & eventName & "
-"
-                end repeat
-                
-                return output
-            end tell
-            '''
+            script = _TODAY_SCRIPT
         
         elif action == "tomorrow":
-            script = '''
-            tell application "Calendar"
-                set tomorrowStart to (current date) + (1 * days)
-                set time of tomorrowStart to 0
-                set tomorrowEnd to tomorrowStart + (1 * days)
-                
-                set eventList to {}
-                repeat with cal in calendars
-                    set calEvents to (every event of cal whose start date ≥ tomorrowStart and start date < tomorrowEnd)
-                    set eventList to eventList & calEvents
-                end repeat
-                
-                if (count of eventList) = 0 then
-                    return "📅 No hay eventos mañana"
-                end if
-                
-                set output to "📅 Eventos de mañana:
-"
-                repeat with evt in eventList
-                    set eventTime to time string of start date of evt
-                    set eventName to summary of evt
-                    set output to output & "  • " & eventTime & " - " & eventName & "
-"
-                end repeat
-                
-                return output
-            end tell
-            '''
+            script = _TOMORROW_SCRIPT
         
         elif action == "week":
-            script = '''
-            tell application "Calendar"
-                set weekStart to current date
-                set time of weekStart to 0
-                set weekEnd to weekStart + (7 * days)
-                
-                set eventList to {}
-                repeat with cal in calendars
-                    set calEvents to (every event of cal whose start date ≥ weekStart and start date < weekEnd)
-                    set eventList to eventList & calEvents
-                end repeat
-                
-                if (count of eventList) = 0 then
-                    return "📅 No hay eventos esta semana"
-                end if
-                
-                set output to "📅 Eventos de esta semana: " & (count of eventList) & " eventos
-"
-                
-                return output
-            end tell
-            '''
+            script = _WEEK_SCRIPT
         
         elif action == "create":
             if not query:
@@ -121,15 +116,9 @@ def calendar_query(action: str = "today", query: str = "") -> Dict[str, Any]:
                     "error": "Necesito un título para el recordatorio"
                 }
             
-            # Crear recordatorio en la app Recordatorios
-            script = f'''
-            tell application "Reminders"
-                tell list "Reminders"
-                    make new reminder with properties {{name:"{query}"}}
-                end tell
-            end tell
-            return "✅ Recordatorio creado: {query}"
-            '''
+            # Crear recordatorio en la app Recordatorios (título por argv)
+            script = _CREATE_REMINDER_SCRIPT
+            args = [query]
         
         else:
             return {
@@ -137,21 +126,15 @@ def calendar_query(action: str = "today", query: str = "") -> Dict[str, Any]:
                 "error": f"Acción desconocida: {action}. Usa: today, tomorrow, week, create"
             }
         
-        # Ejecutar AppleScript
-        result = subprocess.run(
-            ["osascript", "-e", script],
-            capture_output=True,
-            text=True,
-            timeout=15,
-        )
-        
-        if result.returncode != 0:
+        # Ejecutar AppleScript (proceso osascript persistente)
+        try:
+            output = run_applescript(script, args, timeout=15)
+        except AppleScriptError as e:
             return {
                 "ok": False,
-                "error": result.stderr.strip() or "Error accediendo al calendario"
+                "error": str(e) or "Error accediendo al calendario"
             }
         
-        output = result.stdout.strip()
         return {
             "ok": True,
             "result": output or "Consulta ejecutada"
@@ -8,9 +8,177 @@ Se integra con VS Code.
 from __future__ import annotations
 
 import os
+import re
+import shutil
 import subprocess
+import sys
+import tempfile
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from jarvis.tools.credentials import get_tool_secrets
+
+
+# Respuesta envuelta en ```lang ... ``` (la valla de cierre puede faltar)
+_FENCE_RE = re.compile(r"\A```[^\n]*\n(?P<body>.*?)(?:\n```)?\s*\Z", re.DOTALL)
+
+# Extensión de archivo por lenguaje (para nombres generados)
+_EXTENSIONS = MappingProxyType({
+    "python": "py",
+    "javascript": "js",
+    "typescript": "ts",
+    "java": "java",
+    "cpp": "cpp",
+    "c": "c",
+    "rust": "rs",
+    "go": "go",
+    "ruby": "rb",
+    "php": "php",
+})
+
+
+def _workspace(path: str) -> Path:
+    """
+    Workspace resuelto y creado.
+
+    Sin caché: con una ruta relativa el resultado depende del directorio
+    actual, y resolve() del disco (symlinks, carpeta borrada).
+    """
+    workspace_path = Path(path).expanduser().resolve()
+    workspace_path.mkdir(parents=True, exist_ok=True)
+    return workspace_path
+
+
+@lru_cache(maxsize=4)
+def _get_client(api_key: str) -> Any:
+    """
+    Cliente Groq reutilizado entre llamadas (por API key).
+    
+    Importar groq y crear el cliente cuesta decenas de ms; así además se
+    reutiliza su pool de conexiones HTTP.
+    """
+    from groq import Groq
+    
+    return Groq(api_key=api_key)
+
+
+def _is_fence(line: str) -> bool:
+    return line.strip().startswith("```")
+
+
+# Comando para abrir VS Code, resuelto una vez al importar
+if shutil.which("code"):
+    _VSCODE_CMD: Optional[List[str]] = ["code"]
+elif sys.platform == "darwin":
+    _VSCODE_CMD = ["open", "-a", "Visual Studio Code"]
+else:
+    _VSCODE_CMD = None
+
+
+def _open_in_vscode(path: Path) -> bool:
+    """Abre path en VS Code sin esperar a que termine. True si se lanzó."""
+    if not _VSCODE_CMD:
+        return False
+    try:
+        subprocess.Popen(
+            [*_VSCODE_CMD, str(path)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        return True
+    except OSError:
+        return False
+
+
+def _write_streamed_code(
+    chunks: Iterable[str],
+    full_path: Path,
+    on_written: Optional[Callable[[], None]] = None
+) -> str:
+    """
+    Escribe el código según llega, sin las vallas ``` de markdown.
+    
+    Las líneas en blanco o con ``` se retienen hasta ver la siguiente línea
+    de código (podrían ser la valla de cierre). Se escribe en un temporal
+    junto a full_path que solo lo sustituye (os.replace) cuando el stream
+    termina: un corte de red a mitad no deja el archivo a medias ni borra
+    el que hubiera. on_written se llama tras el reemplazo.
+    
+    Returns:
+        El código escrito
+    """
+    written: List[str] = []
+    held: List[str] = []     # líneas en blanco / vallas aún sin escribir
+    pending = ""             # texto sin salto de línea todavía
+    started = False          # ya se ha visto la primera línea no vacía
+    
+    tmp = tempfile.NamedTemporaryFile(
+        "w",
+        encoding="utf-8",
+        dir=full_path.parent,
+        prefix=f".{full_path.name}.",
+        suffix=".tmp",
+        delete=False,
+    )
+    try:
+        with tmp as f:
+            def emit(text: str) -> None:
+                f.write(text)
+                written.append(text)
+            
+            for chunk in chunks:
+                pending += chunk
+                while "\n" in pending:
+                    line, pending = pending.split("\n", 1)
+                    if not started:
+                        if not line.strip():
+                            continue
+                        started = True
+                        if _is_fence(line):
+                            # Valla de apertura (```python o similar)
+                            continue
+                    if not line.strip() or _is_fence(line):
+                        held.append(line)
+                        continue
+                    if held:
+                        emit("\n".join(held) + "\n")
+                        held.clear()
+                    emit(line + "\n")
+            
+            # Final: quitar la valla de cierre y los espacios sobrantes
+            tail = held + [pending]
+            while tail and not tail[-1].strip():
+                tail.pop()
+            if tail and (tail[-1].strip() == "```" or (not started and _is_fence(tail[-1]))):
+                tail.pop()
+            tail_text = "\n".join(tail).rstrip()
+            if not started:
+                tail_text = tail_text.lstrip()
+            if tail_text:
+                emit(tail_text)
+        
+        # El temporal nace con 0600: conservar los permisos del archivo
+        # que se sustituye (o los habituales si es nuevo)
+        try:
+            mode = full_path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp.name, mode)
+        os.replace(tmp.name, full_path)
+    except BaseException:
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+        raise
+    
+    if on_written is not None:
+        on_written()
+    
+    return "".join(written)
 
 
 def code_assistant(
@@ -48,7 +216,7 @@ def code_assistant(
         }
     
     # Obtener API key de Groq para generar el código
-    api_key = os.getenv("GROQ_API_KEY", "")
+    api_key = get_tool_secrets().groq_api_key
     
     if not api_key:
         return {
@@ -57,9 +225,7 @@ def code_assistant(
         }
     
     try:
-        from groq import Groq
-        
-        client = Groq(api_key=api_key)
+        client = _get_client(api_key)
         
         # Construir prompt para generar código
         prompt = f"""Eres un programador experto. Tu tarea es escribir código limpio, funcional y bien documentado.
@@ -76,44 +242,10 @@ INSTRUCCIONES:
 
 Genera el código ahora:"""
         
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=4000,
-            temperature=0.3,  # Más determinista para código
-        )
-        
-        generated_code = response.choices[0].message.content.strip()
-        
-        # Limpiar bloques de markdown si los hay
-        if generated_code.startswith("```"):
-            lines = generated_code.split("\n")
-            # Quitar primera línea (```python o similar)
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            # Quitar última línea (```)
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            generated_code = "\n".join(lines)
-        
-        # Determinar ruta del archivo
+        # Determinar ruta del archivo (antes de generar: se escribe en streaming)
         if not file_path:
             # Generar nombre de archivo automáticamente
-            extensions = {
-                "python": "py",
-                "javascript": "js",
-                "typescript": "ts",
-                "java": "java",
-                "cpp": "cpp",
-                "c": "c",
-                "rust": "rs",
-                "go": "go",
-                "ruby": "rb",
-                "php": "php",
-            }
-            ext = extensions.get(language, "txt")
+            ext = _EXTENSIONS.get(language, "txt")
             
             # Crear nombre basado en la tarea (simplificado)
             safe_name = task.lower()[:30].replace(" ", "_")
@@ -121,38 +253,41 @@ Genera el código ahora:"""
             file_path = f"{safe_name}.{ext}"
         
         # Crear ruta completa
-        workspace_path = Path(workspace).expanduser().resolve()
-        workspace_path.mkdir(parents=True, exist_ok=True)
+        workspace_path = _workspace(workspace)
         
         full_path = workspace_path / file_path
         full_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Guardar código
-        full_path.write_text(generated_code, encoding="utf-8")
+        response = client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=4000,
+            temperature=0.3,  # Más determinista para código
+            stream=True,
+        )
+        
+        # Abrir en VS Code si se solicita, en cuanto el archivo esté completo
+        vscode_opened: List[bool] = []
+        
+        def open_editor() -> None:
+            vscode_opened.append(_open_in_vscode(full_path))
+        
+        # Guardar código según llega, ya sin bloques de markdown
+        generated_code = _write_streamed_code(
+            (chunk.choices[0].delta.content or "" for chunk in response if chunk.choices),
+            full_path,
+            on_written=open_editor if open_vscode else None,
+        )
         
         result = f"✅ Código generado y guardado en: {full_path}"
         
-        # Abrir en VS Code si se solicita
         if open_vscode:
-            try:
-                # Intentar abrir con 'code' command
-                subprocess.run(
-                    ["code", str(full_path)],
-                    timeout=5,
-                    capture_output=True
-                )
+            if vscode_opened and vscode_opened[0]:
                 result += "\n📝 Abierto en VS Code"
-            except FileNotFoundError:
-                # Si 'code' no está instalado, abrir con 'open'
-                try:
-                    subprocess.run(
-                        ["open", "-a", "Visual Studio Code", str(full_path)],
-                        timeout=5,
-                        capture_output=True
-                    )
-                    result += "\n📝 Abierto en VS Code"
-                except:
-                    result += "\n⚠️ No se pudo abrir VS Code automáticamente"
+            else:
+                result += "\n⚠️ No se pudo abrir VS Code automáticamente"
         
         return {
             "ok": True,
@@ -194,7 +329,7 @@ def edit_code(
             "error": "Necesito la ruta del archivo y la instrucción de edición"
         }
     
-    workspace_path = Path(workspace).expanduser().resolve()
+    workspace_path = _workspace(workspace)
     full_path = workspace_path / file_path
     
     if not full_path.exists():
@@ -213,7 +348,7 @@ def edit_code(
         }
     
     # Obtener API key
-    api_key = os.getenv("GROQ_API_KEY", "")
+    api_key = get_tool_secrets().groq_api_key
     
     if not api_key:
         return {
@@ -222,9 +357,7 @@ def edit_code(
         }
     
     try:
-        from groq import Groq
-        
-        client = Groq(api_key=api_key)
+        client = _get_client(api_key)
         
         prompt = f"""Eres un programador experto. Debes editar el siguiente código según la instrucción.
 
@@ -255,13 +388,9 @@ Código modificado:"""
         modified_code = response.choices[0].message.content.strip()
         
         # Limpiar markdown
-        if modified_code.startswith("```"):
-            lines = modified_code.split("\n")
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            modified_code = "\n".join(lines)
+        match = _FENCE_RE.match(modified_code)
+        if match:
+            modified_code = match.group("body")
         
         # Guardar código modificado
         full_path.write_text(modified_code, encoding="utf-8")
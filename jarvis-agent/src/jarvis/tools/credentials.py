@@ -0,0 +1,39 @@
+"""
+credentials.py
+
+Credenciales que usan las herramientas (API keys), leídas una sola vez.
+
+tool_agent_from_settings las configura al arrancar desde Settings; si nadie
+lo ha hecho (tools usadas sueltas), se toma una instantánea del entorno en
+el primer acceso. Las tools no vuelven a consultar os.environ en cada
+llamada.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class ToolSecrets:
+    """Instantánea inmutable de las credenciales de las tools."""
+    groq_api_key: str = ""
+
+
+_SECRETS: Optional[ToolSecrets] = None
+
+
+def configure_tool_secrets(secrets: ToolSecrets) -> None:
+    """Fija las credenciales que verán las tools."""
+    global _SECRETS
+    _SECRETS = secrets
+
+
+def get_tool_secrets() -> ToolSecrets:
+    """Credenciales actuales (del entorno si no se han configurado)."""
+    global _SECRETS
+    if _SECRETS is None:
+        _SECRETS = ToolSecrets(groq_api_key=os.getenv("GROQ_API_KEY", ""))
+    return _SECRETS
@@ -7,7 +7,110 @@ Envío de emails usando la app Mail de macOS.
 from __future__ import annotations
 
 import subprocess
-from typing import Any, Dict
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote, urlencode
+
+from jarvis.tools.osascript import AppleScriptError, run_applescript
+
+
+# Script fijo (se compila una vez): destinatario, asunto, cuerpo y acción
+# llegan por argv, así que no hay que escapar comillas, saltos de línea ni
+# barras invertidas del texto
+_SEND_EMAIL_SCRIPT = '''
+on run argv
+    set {recipientAddress, messageSubject, messageBody, mailAction} to argv
+    set isDraft to (mailAction is "draft")
+    tell application "Mail"
+        set newMessage to make new outgoing message with properties {subject:messageSubject, content:messageBody, visible:isDraft}
+        tell newMessage
+            make new to recipient with properties {address:recipientAddress}
+            if not isDraft then send
+        end tell
+    end tell
+    if isDraft then
+        return "✅ Borrador creado (revisa Mail.app)"
+    end if
+    return "✅ Email enviado a " & recipientAddress
+end run
+'''
+
+# Varios emails en una sola ejecución: argv trae grupos de 4 valores
+# (destinatario, asunto, cuerpo, acción). Devuelve una línea por email,
+# "ok" o el error, para que un fallo no corte el resto del lote.
+_SEND_EMAIL_BATCH_SCRIPT = '''
+on run argv
+    set results to {}
+    tell application "Mail"
+        repeat with i from 1 to (count of argv) by 4
+            set recipientAddress to item i of argv
+            set messageSubject to item (i + 1) of argv
+            set messageBody to item (i + 2) of argv
+            set isDraft to ((item (i + 3) of argv) is "draft")
+            try
+                set newMessage to make new outgoing message with properties {subject:messageSubject, content:messageBody, visible:isDraft}
+                tell newMessage
+                    make new to recipient with properties {address:recipientAddress}
+                    if not isDraft then send
+                end tell
+                set end of results to "ok"
+            on error errorMessage
+                set end of results to "error: " & my oneLine(errorMessage)
+            end try
+        end repeat
+    end tell
+    set AppleScript's text item delimiters to linefeed
+    return results as text
+end run
+
+-- Una línea por email: los saltos de línea del mensaje de error se quitan
+on oneLine(message)
+    set AppleScript's text item delimiters to {return, linefeed}
+    set parts to text items of (message as text)
+    set AppleScript's text item delimiters to " "
+    return parts as text
+end oneLine
+'''
+
+_EmailArgs = Tuple[str, str, str, str]
+
+# Los borradores se abren con una URL mailto: en Mail (ventana de redacción
+# con los campos rellenos), sin AppleScript. Por encima de este tamaño se usa
+# el script: algunos gestores de URL recortan las URLs muy largas
+_MAILTO_MAX = 8000
+
+
+def _prepare_email(
+    to: str,
+    subject: str,
+    body: str,
+    action: str
+) -> Union[_EmailArgs, Dict[str, Any]]:
+    """Normaliza y valida un email: (to, subject, body, action) o un dict de error."""
+    to = (to or "").strip()
+    subject = (subject or "").strip()
+    body = (body or "").strip()
+    action = (action or "send").lower().strip()
+    
+    if not to:
+        return {
+            "ok": False,
+            "error": "Necesito un destinatario (email)"
+        }
+    
+    if not subject:
+        return {
+            "ok": False,
+            "error": "Necesito un asunto para el email"
+        }
+    
+    if action not in ("send", "draft"):
+        return {
+            "ok": False,
+            "error": f"Acción desconocida: {action}. Usa: send o draft"
+        }
+    
+    return to, subject, body, action
 
 
 def send_email(
@@ -28,75 +131,62 @@ def send_email(
     Returns:
         Dict con ok, result o error
     """
-    to = (to or "").strip()
-    subject = (subject or "").strip()
-    body = (body or "").strip()
-    action = (action or "send").lower().strip()
+    prepared = _prepare_email(to, subject, body, action)
+    if isinstance(prepared, dict):
+        return prepared
+    return _send_prepared(prepared)
+
+
+def _open_draft(to: str, subject: str, body: str) -> bool:
+    """
+    Abre en Mail un borrador vía mailto: (sin osascript).
     
-    if not to:
-        return {
-            "ok": False,
-            "error": "Necesito un destinatario (email)"
-        }
+    Returns:
+        True si se abrió; False si no aplica (no es macOS, URL demasiado
+        larga) o falló, y hay que usar AppleScript
+    """
+    if sys.platform != "darwin":
+        return False
     
-    if not subject:
-        return {
-            "ok": False,
-            "error": "Necesito un asunto para el email"
-        }
+    query = urlencode({"subject": subject, "body": body}, quote_via=quote)
+    url = f"mailto:{quote(to, safe='@,')}?{query}"
+    if len(url) > _MAILTO_MAX:
+        return False
     
     try:
-        # Escapar comillas en el texto
-        to_safe = to.replace('"', '\\"')
-        subject_safe = subject.replace('"', '\\"')
-        body_safe = body.replace('"', '\\"')
-        
-        if action == "send":
-            # Crear y enviar email
-            script = f'''
-            tell application "Mail"
-                set newMessage to make new outgoing message with properties {{subject:"{subject_safe}", content:"{body_safe}", visible:false}}
-                tell newMessage
-                    make new to recipient with properties {{address:"{to_safe}"}}
-                    send
-                end tell
-            end tell
-            return "✅ Email enviado a {to_safe}"
-            '''
-        
-        elif action == "draft":
-            # Crear borrador (no enviar)
-            script = f'''
-            tell application "Mail"
-                set newMessage to make new outgoing message with properties {{subject:"{subject_safe}", content:"{body_safe}", visible:true}}
-                tell newMessage
-                    make new to recipient with properties {{address:"{to_safe}"}}
-                end tell
-            end tell
-            return "✅ Borrador creado (revisa Mail.app)"
-            '''
-        
-        else:
-            return {
-                "ok": False,
-                "error": f"Acción desconocida: {action}. Usa: send o draft"
-            }
-        
-        # Ejecutar AppleScript
-        result = subprocess.run(
-            ["osascript", "-e", script],
+        completed = subprocess.run(
+            ["open", "-a", "Mail", url],
             capture_output=True,
-            text=True,
-            timeout=15,
+            timeout=10,
         )
-        
-        if result.returncode != 0:
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return completed.returncode == 0
+
+
+def _send_prepared(prepared: _EmailArgs) -> Dict[str, Any]:
+    """Envía un email ya validado."""
+    to, subject, body, action = prepared
+    if action == "draft" and _open_draft(to, subject, body):
+        return {
+            "ok": True,
+            "result": "✅ Borrador creado (revisa Mail.app)"
+        }
+    
+    try:
+        # Ejecutar AppleScript (compilado una vez, datos por argv)
+        try:
+            output = run_applescript(
+                _SEND_EMAIL_SCRIPT,
+                list(prepared),
+                timeout=15,
+            )
+        except AppleScriptError as e:
             return {
                 "ok": False,
-                "error": result.stderr.strip() or "Error enviando email"
+                "error": str(e) or "Error enviando email"
             }
         
-        output = result.stdout.strip()
         return {
             "ok": True,
             "result": output or "Email procesado"
@@ -106,3 +196,78 @@ def send_email(
         return {"ok": False, "error": "Timeout enviando email"}
     except Exception as e:
         return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def send_email_batch(
+    emails: Sequence[Dict[str, Any]] = (),
+    timeout: float = 60.0
+) -> Dict[str, Any]:
+    """
+    Envía varios emails con una sola ejecución de AppleScript.
+    
+    Mail.app recibe todos los mensajes en una única llamada (un solo viaje
+    al proceso osascript) en vez de una por email.
+    
+    Args:
+        emails: Dicts con las claves de send_email (to, subject, body, action)
+        timeout: Segundos máximos para todo el lote
+    
+    Returns:
+        Dict con ok (todos enviados), result (resumen) y results: un dict
+        ok/result o ok/error por email, en el mismo orden
+    """
+    if not emails:
+        return {
+            "ok": False,
+            "error": "Necesito al menos un email en la lista"
+        }
+    
+    results: List[Optional[Dict[str, Any]]] = []
+    args: List[str] = []
+    pending: List[int] = []   # posiciones de results que se envían
+    
+    for email in emails:
+        if not isinstance(email, dict):
+            results.append({"ok": False, "error": "Cada email debe ser un objeto {to, subject, body, action}"})
+            continue
+        prepared = _prepare_email(
+            email.get("to", ""),
+            email.get("subject", ""),
+            email.get("body", ""),
+            email.get("action", "send"),
+        )
+        if isinstance(prepared, dict):
+            results.append(prepared)
+            continue
+        pending.append(len(results))
+        results.append(None)
+        args.extend(prepared)
+    
+    if pending:
+        try:
+            output = run_applescript(_SEND_EMAIL_BATCH_SCRIPT, args, timeout=timeout)
+            lines = output.splitlines()
+            if len(lines) != len(pending):
+                # Cada línea es el resultado del email en esa posición: si
+                # no cuadran no se sabe cuál se ha enviado
+                lines = [f"error: Respuesta de Mail no reconocida ({len(lines)} resultados para {len(pending)} emails)"] * len(pending)
+        except subprocess.TimeoutExpired:
+            lines = ["error: Timeout enviando email"] * len(pending)
+        except Exception as e:
+            lines = [f"error: {type(e).__name__}: {e}"] * len(pending)
+        
+        for slot, (index, line) in enumerate(zip(pending, lines)):
+            to = args[slot * 4]
+            if line == "ok":
+                results[index] = {"ok": True, "result": f"✅ Email procesado: {to}"}
+            else:
+                results[index] = {"ok": False, "error": line.removeprefix("error: ")}
+    
+    final = [r or {"ok": False, "error": "Sin respuesta de Mail"} for r in results]
+    sent = sum(1 for r in final if r["ok"])
+    icon = "✅" if sent == len(final) else "⚠️"
+    return {
+        "ok": sent == len(final),
+        "result": f"{icon} {sent}/{len(final)} emails procesados",
+        "results": final
+    }
@@ -22,27 +22,252 @@ Nota:
 
 from __future__ import annotations
 
+import os
 import shutil
+import stat
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 
-def _resolve_in_root(root: Path, user_path: str) -> Path:
+# read_text devuelve como mucho esto (bytes); más allá se trunca
+_READ_LIMIT = 1024 * 1024
+
+# Acciones que modifican el disco: no siguen symlinks del camino
+_STRICT_SYMLINK_ACTIONS = frozenset({"write_text", "delete"})
+
+# list_dir devuelve como mucho estas entradas si no se indica max_items
+_LIST_MAX_ITEMS = 500
+
+def _workspace_root(raw: str, create: bool = True) -> Path:
+    """
+    Resuelve root_dir (y lo crea si create).
+
+    Se resuelve en cada llamada, sin caché: un root_dir relativo depende del
+    directorio actual y el workspace puede borrarse o cambiar de destino.
+    """
+    root = Path(raw).expanduser().resolve()
+    if create:
+        root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def _normalize_user_path(user_path: str) -> str:
+    """
+    Normaliza user_path sin tocar el disco y rechaza rutas absolutas o que
+    salgan con ".." (tras normpath los ".." que quedan están al principio).
+    """
+    normalized = os.path.normpath(user_path)
+    if (
+        os.path.isabs(normalized)
+        or normalized == os.pardir
+        or normalized.startswith(os.pardir + os.sep)
+    ):
+        raise PermissionError(f"Ruta fuera del workspace: {user_path}")
+    return normalized
+
+
+def _reject_symlinks(root: str, normalized: str) -> None:
+    """
+    Recorre con lstat cada tramo de root/normalized (sin resolver) y falla si
+    alguno es un symlink. Los tramos que aún no existen se ignoran.
+    """
+    current = root
+    for part in normalized.split(os.sep):
+        if part in ("", os.curdir):
+            continue
+        current = os.path.join(current, part)
+        try:
+            mode = os.lstat(current).st_mode
+        except FileNotFoundError:
+            return
+        if stat.S_ISLNK(mode):
+            raise PermissionError(f"Symlink rechazado: {current}")
+
+
+def _resolve_in_root(root: Path, user_path: str, strict_symlinks: bool = False) -> Path:
     """
     Resuelve user_path dentro de root y aplica cortafuegos:
     el path final debe estar dentro de root (evita ../ o rutas absolutas).
+
+    root tiene que venir ya resuelto (ver _workspace_root). Con
+    strict_symlinks se rechaza cualquier symlink del camino, aunque apunte
+    dentro del workspace (se mira antes de resolver, que los borraría).
     """
-    root = root.resolve()
-    # Permitimos que el usuario pase rutas como "subdir/file.txt"
-    p = (root / user_path).expanduser().resolve()
 
-    # Cortafuegos: p debe estar dentro de root
-    if p != root and root not in p.parents:
-        raise PermissionError(f"Ruta fuera del workspace: {p}")
-    return p
+    # 1) La ruta del usuario tiene que ser relativa y no salir con ".."
+    normalized = _normalize_user_path(user_path)
+
+    if strict_symlinks:
+        _reject_symlinks(str(root), normalized)
+
+    # 2) realpath sigue los symlinks: un enlace dentro del workspace que
+    #    apunte fuera también se rechaza. is_relative_to compara por
+    #    componentes, así /ws-secretos no cuenta como "dentro" de /ws
+    candidate = Path(os.path.realpath(os.path.join(root, normalized)))
+    if not candidate.is_relative_to(root):
+        raise PermissionError(f"Ruta fuera del workspace: {candidate}")
+    return candidate
+
+
+def _exists(raw_root: str, user_path: Any) -> Dict[str, Any]:
+    """Acción exists sin crear el workspace."""
+    if not user_path:
+        raise ValueError("exists requiere args['path'].")
+
+    # Primero el cortafuegos: si se respondiera "no existe" antes de
+    # resolver, un symlink del workspace que apunte fuera permitiría sondear
+    # qué archivos hay fuera (no existe -> False, existe -> PermissionError)
+    target = _resolve_in_root(_workspace_root(raw_root, create=False), str(user_path))
+
+    # Ya dentro del root: basta un lstat para el caso "no existe"
+    if not os.path.lexists(target):
+        return {"action": "exists", "path": str(target), "exists": False, "is_dir": None}
+    return {
+        "action": "exists",
+        "path": str(target),
+        "exists": True,
+        "is_dir": target.is_dir(),
+    }
+
+
+def _write_text(target: Path, user_path: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    if not user_path:
+        raise ValueError("write_text requiere args['path'].")
+    # Se codifica una sola vez: lo mismo que se escribe da el tamaño
+    encoded = str(args.get("content", "")).encode("utf-8")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(encoded)
+    return {
+        "action": "write_text",
+        "path": str(target),
+        "bytes": len(encoded),
+    }
+
+
+def _read_text(target: Path, user_path: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    if not user_path:
+        raise ValueError("read_text requiere args['path'].")
+    if not target.exists():
+        raise FileNotFoundError(f"No existe: {target}")
+    if target.is_dir():
+        raise IsADirectoryError(f"Es un directorio: {target}")
+
+    size = target.stat().st_size
+    if size > _READ_LIMIT:
+        # Archivo grande: solo el principio, sin cargarlo entero en memoria
+        with target.open("rb") as f:
+            head = f.read(_READ_LIMIT)
+        return {
+            "action": "read_text",
+            "path": str(target),
+            "content": head.decode("utf-8", errors="ignore"),
+            "bytes": size,
+            "truncated": True,
+        }
+    return {
+        "action": "read_text",
+        "path": str(target),
+        "content": target.read_text(encoding="utf-8"),
+    }
+
+
+def _list_dir(target: Path, user_path: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    if not target.exists():
+        raise FileNotFoundError(f"No existe: {target}")
+    if not target.is_dir():
+        raise NotADirectoryError(f"No es directorio: {target}")
+
+    # null o fuera de rango (el modelo a veces manda 0 o negativos): se
+    # acota a 1.._LIST_MAX_ITEMS
+    raw_max = args.get("max_items")
+    max_items = _LIST_MAX_ITEMS if raw_max is None else int(raw_max)
+    max_items = min(max(max_items, 1), _LIST_MAX_ITEMS)
+
+    def by_name(entry: os.DirEntry) -> str:
+        return entry.name
 
+    # Una sola lectura del directorio: scandir trae el tipo de cada
+    # entrada (sin un stat() por hijo) y DirEntry.stat() queda cacheado.
+    # Solo se guardan las max_items primeras por nombre (se recorta cuando
+    # se acumula el doble), aunque el directorio tenga miles de entradas;
+    # total cuenta todas
+    entries: List[os.DirEntry] = []
+    total = 0
+    with os.scandir(target) as it:
+        for entry in it:
+            total += 1
+            entries.append(entry)
+            if len(entries) >= 2 * max_items:
+                entries.sort(key=by_name)
+                del entries[max_items:]
+    entries.sort(key=by_name)
+    del entries[max_items:]
 
-def run_filesystem(args: Dict[str, Any]) -> Dict[str, Any]:
+    items: List[Dict[str, Any]] = []
+    for entry in entries:
+        items.append(
+            {
+                "name": entry.name,
+                "path": entry.path,
+                "is_dir": entry.is_dir(follow_symlinks=False),
+                "size": (
+                    entry.stat(follow_symlinks=False).st_size
+                    if entry.is_file(follow_symlinks=False)
+                    else None
+                ),
+            }
+        )
+
+    result: Dict[str, Any] = {
+        "action": "list_dir",
+        "path": str(target),
+        "items": items,
+    }
+    if total > len(items):
+        result["truncated"] = True
+        result["total"] = total
+    return result
+
+
+def _mkdir(target: Path, user_path: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    if not user_path:
+        raise ValueError("mkdir requiere args['path'].")
+    target.mkdir(parents=True, exist_ok=True)
+    return {
+        "action": "mkdir",
+        "path": str(target),
+    }
+
+
+def _delete(target: Path, user_path: Any, args: Dict[str, Any]) -> Dict[str, Any]:
+    if not user_path:
+        raise ValueError("delete requiere args['path'].")
+    if not target.exists():
+        return {"action": "delete", "path": str(target), "deleted": False, "reason": "not_found"}
+
+    recursive = bool(args.get("recursive", False))
+    if target.is_dir():
+        if not recursive:
+            # Evita borrar carpetas por error si no se indica recursive
+            raise PermissionError("Para borrar directorios usa recursive=True.")
+        shutil.rmtree(target)
+    else:
+        target.unlink()
+
+    return {"action": "delete", "path": str(target), "deleted": True}
+
+
+# Acción -> handler(target, user_path, args). exists va aparte (ver _exists)
+_ACTIONS: Dict[str, Callable[[Path, Any, Dict[str, Any]], Dict[str, Any]]] = {
+    "write_text": _write_text,
+    "read_text": _read_text,
+    "list_dir": _list_dir,
+    "mkdir": _mkdir,
+    "delete": _delete,
+}
+
+
+def run_filesystem(**args: Any) -> Dict[str, Any]:
     """
     Args esperados:
       - action: str (obligatorio) -> write_text/read_text/list_dir/mkdir/exists/delete
@@ -50,6 +275,7 @@ def run_filesystem(args: Dict[str, Any]) -> Dict[str, Any]:
       - path: str (según action)  -> ruta relativa dentro del workspace
       - content: str (solo write_text)
       - recursive: bool (solo delete) -> borrar carpetas recursivo
+      - max_items: int (solo list_dir) -> máximo de entradas (1..500, default 500)
 
     Devuelve dict con detalles de la operación.
     """
@@ -57,95 +283,25 @@ def run_filesystem(args: Dict[str, Any]) -> Dict[str, Any]:
     if not action:
         raise ValueError("Falta args['action'].")
 
-    root_dir = Path(str(args.get("root_dir", "data/workspace"))).expanduser().resolve()
-    root_dir.mkdir(parents=True, exist_ok=True)
-
-    # path es opcional para list_dir (si no viene lista root)
-    user_path = args.get("path")
-    target: Path = root_dir if not user_path else _resolve_in_root(root_dir, str(user_path))
-
-    if action == "write_text":
-        if not user_path:
-            raise ValueError("write_text requiere args['path'].")
-        content = str(args.get("content", ""))
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(content, encoding="utf-8")
-        return {
-            "action": action,
-            "path": str(target),
-            "bytes": len(content.encode("utf-8")),
-        }
-
-    if action == "read_text":
-        if not user_path:
-            raise ValueError("read_text requiere args['path'].")
-        if not target.exists():
-            raise FileNotFoundError(f"No existe: {target}")
-        if target.is_dir():
-            raise IsADirectoryError(f"Es un directorio: {target}")
-        return {
-            "action": action,
-            "path": str(target),
-            "content": target.read_text(encoding="utf-8"),
-        }
-
-    if action == "list_dir":
-        if not target.exists():
-            raise FileNotFoundError(f"No existe: {target}")
-        if not target.is_dir():
-            raise NotADirectoryError(f"No es directorio: {target}")
-
-        items: List[Dict[str, Any]] = []
-        for child in sorted(target.iterdir()):
-            items.append(
-                {
-                    "name": child.name,
-                    "path": str(child),
-                    "is_dir": child.is_dir(),
-                    "size": child.stat().st_size if child.is_file() else None,
-                }
-            )
-
-        return {
-            "action": action,
-            "path": str(target),
-            "items": items,
-        }
-
-    if action == "mkdir":
-        if not user_path:
-            raise ValueError("mkdir requiere args['path'].")
-        target.mkdir(parents=True, exist_ok=True)
-        return {
-            "action": action,
-            "path": str(target),
-        }
+    raw_root = str(args.get("root_dir", "data/workspace"))
 
     if action == "exists":
-        if not user_path:
-            raise ValueError("exists requiere args['path'].")
-        return {
-            "action": action,
-            "path": str(target),
-            "exists": target.exists(),
-            "is_dir": target.is_dir() if target.exists() else None,
-        }
+        # Camino rápido (p. ej. para sondear hasta que aparezca un archivo):
+        # no crea el workspace y, si la ruta no existe, basta un lstat
+        return _exists(raw_root, args.get("path"))
 
-    if action == "delete":
-        if not user_path:
-            raise ValueError("delete requiere args['path'].")
-        if not target.exists():
-            return {"action": action, "path": str(target), "deleted": False, "reason": "not_found"}
+    handler = _ACTIONS.get(action)
+    if handler is None:
+        raise ValueError(f"Acción no soportada: {action}")
 
-        recursive = bool(args.get("recursive", False))
-        if target.is_dir():
-            if not recursive:
-                # Evita borrar carpetas por error si no se indica recursive
-                raise PermissionError("Para borrar directorios usa recursive=True.")
-            shutil.rmtree(target)
-        else:
-            target.unlink()
+    root_dir = _workspace_root(raw_root)
 
-        return {"action": action, "path": str(target), "deleted": True}
+    # path es opcional para list_dir (si no viene lista root)
+    user_path = args.get("path")
+    target: Path = root_dir if not user_path else _resolve_in_root(
+        root_dir,
+        str(user_path),
+        strict_symlinks=action in _STRICT_SYMLINK_ACTIONS,
+    )
 
-    raise ValueError(f"Acción no soportada: {action}")
\ No newline at end of file
+    return handler(target, user_path, args)
@@ -6,24 +6,231 @@ Herramienta para gestionar la base de conocimiento de Jarvis.
 
 from __future__ import annotations
 
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Callable, Dict
 
-from jarvis.knowledge.knowledge_base import KnowledgeBase
+if TYPE_CHECKING:
+    from jarvis.knowledge.knowledge_base import KnowledgeBase
 
 
-# Instancia global de knowledge base
+# Instancia global de knowledge base (se crea en el primer uso)
 _kb: KnowledgeBase | None = None
+_kb_lock = threading.Lock()
 
 
 def get_knowledge_base() -> KnowledgeBase:
-    """Obtiene o crea la instancia de knowledge base."""
+    """
+    Obtiene o crea la instancia de knowledge base.
+    
+    KnowledgeBase (chromadb y el modelo de embeddings) se importa aquí y no
+    al cargar el módulo, para no pagarlo al construir el registro de tools.
+    El lock evita crear dos instancias si varios hilos llegan a la vez.
+    """
     global _kb
     if _kb is None:
-        _kb = KnowledgeBase(persist_directory="data/knowledge")
+        with _kb_lock:
+            if _kb is None:
+                from jarvis.knowledge.knowledge_base import KnowledgeBase
+                
+                _kb = KnowledgeBase(persist_directory="data/knowledge")
     return _kb
 
 
+def format_search_result(index: int, doc: Dict[str, Any]) -> str:
+    """Entrada numerada de un resultado de search."""
+    meta = doc['metadata']
+    doc_type = meta.get('type', 'general')
+    
+    if doc_type == 'code':
+        line = f"[Código {meta.get('language', '')}] {meta.get('description', '')}"
+    elif doc_type == 'tutorial':
+        line = f"[Tutorial] {meta.get('title', '')}"
+    else:
+        line = f"{doc['content'][:150]}..."
+    
+    return f"{index}. {line}\n   ID: {doc['id']}\n\n"
+
+
+def format_list_item(doc: Dict[str, Any]) -> str:
+    """Entrada de un documento en list."""
+    meta = doc['metadata']
+    doc_type = meta.get('type', 'general')
+    
+    if doc_type == 'code':
+        line = f"[Código {meta.get('language', '')}] {meta.get('description', '')}"
+    elif doc_type == 'tutorial':
+        line = f"[Tutorial] {meta.get('title', '')} ({meta.get('category', '')})"
+    else:
+        line = meta.get('title', 'Sin título')
+    
+    return f"• {line}\n  ID: {doc['id']}\n"
+
+
+# SEARCH - Buscar información
+def _search(kb: KnowledgeBase, p: Dict[str, Any]) -> Dict[str, Any]:
+    query = p["query"]
+    if not query:
+        return {
+            "ok": False,
+            "error": "Necesito una consulta para buscar"
+        }
+    
+    results = kb.search(query, n_results=p["n_results"])
+    
+    if not results:
+        return {
+            "ok": True,
+            "result": f"No encontré información sobre '{query}' en mi base de conocimiento."
+        }
+    
+    # Formatear resultados (join en vez de += para no copiar la cadena entera)
+    parts = [f"📚 Encontré {len(results)} resultado(s) sobre '{query}':\n\n"]
+    parts.extend(format_search_result(i, doc) for i, doc in enumerate(results, 1))
+    
+    return {
+        "ok": True,
+        "result": "".join(parts).strip(),
+        "results": results
+    }
+
+
+# ADD - Añadir documento general
+def _add(kb: KnowledgeBase, p: Dict[str, Any]) -> Dict[str, Any]:
+    if not p["content"]:
+        return {
+            "ok": False,
+            "error": "Necesito contenido para añadir"
+        }
+    
+    metadata = {
+        "type": "general",
+        "title": p["title"] or "Sin título"
+    }
+    
+    doc_id = kb.add_document(p["content"], metadata)
+    
+    return {
+        "ok": True,
+        "result": f"✅ Documento añadido a mi base de conocimiento\nID: {doc_id}",
+        "doc_id": doc_id
+    }
+
+
+# ADD_CODE - Añadir snippet de código
+def _add_code(kb: KnowledgeBase, p: Dict[str, Any]) -> Dict[str, Any]:
+    content, title, language, tags = p["content"], p["title"], p["language"], p["tags"]
+    if not content:
+        return {
+            "ok": False,
+            "error": "Necesito el código para añadir"
+        }
+    
+    if not title:
+        return {
+            "ok": False,
+            "error": "Necesito una descripción del código"
+        }
+    
+    tag_list = [t.strip() for t in tags.split(",") if t.strip()] if tags else []
+    
+    doc_id = kb.add_code_snippet(
+        code=content,
+        language=language,
+        description=title,
+        tags=tag_list
+    )
+    
+    return {
+        "ok": True,
+        "result": f"✅ Código {language} añadido a mi base de conocimiento\nDescripción: {title}\nID: {doc_id}",
+        "doc_id": doc_id
+    }
+
+
+# ADD_TUTORIAL - Añadir tutorial
+def _add_tutorial(kb: KnowledgeBase, p: Dict[str, Any]) -> Dict[str, Any]:
+    content, title, category = p["content"], p["title"], p["category"]
+    if not content or not title:
+        return {
+            "ok": False,
+            "error": "Necesito título y contenido del tutorial"
+        }
+    
+    doc_id = kb.add_tutorial(
+        title=title,
+        content=content,
+        category=category
+    )
+    
+    return {
+        "ok": True,
+        "result": f"✅ Tutorial añadido a mi base de conocimiento\nTítulo: {title}\nCategoría: {category}\nID: {doc_id}",
+        "doc_id": doc_id
+    }
+
+
+# LIST - Listar documentos
+def _list(kb: KnowledgeBase, p: Dict[str, Any]) -> Dict[str, Any]:
+    docs = kb.list_all(limit=20)
+    
+    if not docs:
+        return {
+            "ok": True,
+            "result": "Mi base de conocimiento está vacía."
+        }
+    
+    parts = [f"📚 Tengo {kb.count()} documento(s) en mi base de conocimiento:\n\n"]
+    parts.extend(format_list_item(doc) for doc in docs)
+    
+    return {
+        "ok": True,
+        "result": "".join(parts).strip()
+    }
+
+
+# DELETE - Eliminar documento
+def _delete(kb: KnowledgeBase, p: Dict[str, Any]) -> Dict[str, Any]:
+    doc_id = p["doc_id"]
+    if not doc_id:
+        return {
+            "ok": False,
+            "error": "Necesito el ID del documento a eliminar"
+        }
+    
+    if kb.delete(doc_id):
+        return {
+            "ok": True,
+            "result": f"✅ Documento {doc_id} eliminado de mi base de conocimiento"
+        }
+    return {
+        "ok": False,
+        "error": f"No encontré el documento {doc_id}"
+    }
+
+
+# STATS - Estadísticas
+def _stats(kb: KnowledgeBase, p: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ok": True,
+        "result": f"📊 Estadísticas de mi base de conocimiento:\n\nTotal documentos: {kb.count()}"
+    }
+
+
+_ACTIONS: Dict[str, Callable[[KnowledgeBase, Dict[str, Any]], Dict[str, Any]]] = {
+    "search": _search,
+    "add": _add,
+    "add_code": _add_code,
+    "add_tutorial": _add_tutorial,
+    "list": _list,
+    "delete": _delete,
+    "stats": _stats,
+}
+
+# Calculado una vez: mensaje para acciones desconocidas
+_ACTION_NAMES = ", ".join(_ACTIONS)
+
+
 def knowledge_tool(
     action: str = "search",
     query: str = "",
@@ -62,185 +269,24 @@ def knowledge_tool(
     """
     action = (action or "search").lower().strip()
     
+    handler = _ACTIONS.get(action)
+    if handler is None:
+        return {
+            "ok": False,
+            "error": f"Acción desconocida: {action}. Usa: {_ACTION_NAMES}"
+        }
+    
     try:
-        kb = get_knowledge_base()
-        
-        # SEARCH - Buscar información
-        if action == "search":
-            if not query:
-                return {
-                    "ok": False,
-                    "error": "Necesito una consulta para buscar"
-                }
-            
-            results = kb.search(query, n_results=n_results)
-            
-            if not results:
-                return {
-                    "ok": True,
-                    "result": f"No encontré información sobre '{query}' en mi base de conocimiento."
-                }
-            
-            # Formatear resultados
-            output = f"📚 Encontré {len(results)} resultado(s) sobre '{query}':\n\n"
-            
-            for i, doc in enumerate(results, 1):
-                meta = doc['metadata']
-                doc_type = meta.get('type', 'general')
-                
-                output += f"{i}. "
-                
-                if doc_type == 'code':
-                    output += f"[Código {meta.get('language', '')}] {meta.get('description', '')}\n"
-                elif doc_type == 'tutorial':
-                    output += f"[Tutorial] {meta.get('title', '')}\n"
-                else:
-                    output += f"{doc['content'][:150]}...\n"
-                
-                output += f"   ID: {doc['id']}\n\n"
-            
-            return {
-                "ok": True,
-                "result": output.strip(),
-                "results": results
-            }
-        
-        # ADD - Añadir documento general
-        elif action == "add":
-            if not content:
-                return {
-                    "ok": False,
-                    "error": "Necesito contenido para añadir"
-                }
-            
-            metadata = {
-                "type": "general",
-                "title": title or "Sin título"
-            }
-            
-            doc_id = kb.add_document(content, metadata)
-            
-            return {
-                "ok": True,
-                "result": f"✅ Documento añadido a mi base de conocimiento\nID: {doc_id}",
-                "doc_id": doc_id
-            }
-        
-        # ADD_CODE - Añadir snippet de código
-        elif action == "add_code":
-            if not content:
-                return {
-                    "ok": False,
-                    "error": "Necesito el código para añadir"
-                }
-            
-            if not title:
-                return {
-                    "ok": False,
-                    "error": "Necesito una descripción del código"
-                }
-            
-            tag_list = [t.strip() for t in tags.split(",") if t.strip()] if tags else []
-            
-            doc_id = kb.add_code_snippet(
-                code=content,
-                language=language,
-                description=title,
-                tags=tag_list
-            )
-            
-            return {
-                "ok": True,
-                "result": f"✅ Código {language} añadido a mi base de conocimiento\nDescripción: {title}\nID: {doc_id}",
-                "doc_id": doc_id
-            }
-        
-        # ADD_TUTORIAL - Añadir tutorial
-        elif action == "add_tutorial":
-            if not content or not title:
-                return {
-                    "ok": False,
-                    "error": "Necesito título y contenido del tutorial"
-                }
-            
-            doc_id = kb.add_tutorial(
-                title=title,
-                content=content,
-                category=category
-            )
-            
-            return {
-                "ok": True,
-                "result": f"✅ Tutorial añadido a mi base de conocimiento\nTítulo: {title}\nCategoría: {category}\nID: {doc_id}",
-                "doc_id": doc_id
-            }
-        
-        # LIST - Listar documentos
-        elif action == "list":
-            docs = kb.list_all(limit=20)
-            
-            if not docs:
-                return {
-                    "ok": True,
-                    "result": "Mi base de conocimiento está vacía."
-                }
-            
-            output = f"📚 Tengo {kb.count()} documento(s) en mi base de conocimiento:\n\n"
-            
-            for doc in docs:
-                meta = doc['metadata']
-                doc_type = meta.get('type', 'general')
-                
-                if doc_type == 'code':
-                    output += f"• [Código {meta.get('language', '')}] {meta.get('description', '')}\n"
-                elif doc_type == 'tutorial':
-                    output += f"• [Tutorial] {meta.get('title', '')} ({meta.get('category', '')})\n"
-                else:
-                    output += f"• {meta.get('title', 'Sin título')}\n"
-                
-                output += f"  ID: {doc['id']}\n"
-            
-            return {
-                "ok": True,
-                "result": output.strip()
-            }
-        
-        # DELETE - Eliminar documento
-        elif action == "delete":
-            if not doc_id:
-                return {
-                    "ok": False,
-                    "error": "Necesito el ID del documento a eliminar"
-                }
-            
-            success = kb.delete(doc_id)
-            
-            if success:
-                return {
-                    "ok": True,
-                    "result": f"✅ Documento {doc_id} eliminado de mi base de conocimiento"
-                }
-            else:
-                return {
-                    "ok": False,
-                    "error": f"No encontré el documento {doc_id}"
-                }
-        
-        # STATS - Estadísticas
-        elif action == "stats":
-            count = kb.count()
-            
-            return {
-                "ok": True,
-                "result": f"📊 Estadísticas de mi base de conocimiento:\n\nTotal documentos: {count}"
-            }
-        
-        else:
-            return {
-                "ok": False,
-                "error": f"Acción desconocida: {action}. Usa: search, add, add_code, add_tutorial, list, delete, stats"
-            }
-        
+        return handler(get_knowledge_base(), {
+            "query": query,
+            "content": content,
+            "title": title,
+            "language": language,
+            "category": category,
+            "tags": tags,
+            "doc_id": doc_id,
+            "n_results": n_results,
+        })
     except Exception as e:
         return {
             "ok": False,
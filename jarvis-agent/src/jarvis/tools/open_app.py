@@ -10,7 +10,8 @@ Uso típico:
 - "Abre esta URL"
 
 Implementación:
-- macOS tiene el comando `open`:
+- Con PyObjC instalado, los casos comunes van por NSWorkspace (en proceso).
+- Si no, macOS tiene el comando `open`:
   - open -a "App Name"           (abre una app por nombre)
   - open "https://..."           (abre URL con el navegador)
   - open "/ruta/al/archivo"      (abre archivo con app por defecto)
@@ -24,10 +25,55 @@ from __future__ import annotations
 
 import subprocess
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+try:
+    from AppKit import NSWorkspace
+    from Foundation import NSURL
+    APPKIT_AVAILABLE = True
+except ImportError:  # opcional: sin PyObjC se usa siempre `open`
+    APPKIT_AVAILABLE = False
 
-def run_open_app(args: Dict[str, Any]) -> Dict[str, Any]:
+
+def _expand(t: str) -> str:
+    """
+    Ruta local expandida y resuelta.
+
+    Sin caché: expanduser lee HOME del entorno y resolve() depende del disco
+    (un symlink o carpeta creados después cambian el resultado).
+    """
+    return str(Path(t).expanduser().resolve())
+
+
+def _open_native(app: Optional[str], target: Optional[str]) -> Optional[bool]:
+    """
+    Abre app/target con NSWorkspace, dentro del proceso (sin fork+exec de
+    `open`, que cuesta decenas de ms).
+
+    Returns:
+        True/False según NSWorkspace, o None si el caso no se cubre aquí
+        (URL con app concreta, texto que no es URL ni ruta) y hay que usar
+        `open`.
+    """
+    ws = NSWorkspace.sharedWorkspace()
+
+    if target is None:
+        return bool(ws.launchApplication_(app))
+
+    if target.startswith("/"):
+        if app:
+            return bool(ws.openFile_withApplication_(target, app))
+        return bool(ws.openFile_(target))
+
+    if app is None and "://" in target:
+        url = NSURL.URLWithString_(target)
+        if url is not None:
+            return bool(ws.openURL_(url))
+
+    return None
+
+
+def run_open_app(**args: Any) -> Dict[str, Any]:
     """
     Abre una app o un target (url/archivo) usando `open` de macOS.
 
@@ -51,7 +97,7 @@ def run_open_app(args: Dict[str, Any]) -> Dict[str, Any]:
     if not app and not target:
         raise ValueError("Debes pasar 'app' o 'target'.")
 
-    cmd = ["open"]
+    cmd: List[str] = ["open"]
 
     # -n: abrir nueva instancia (cuando aplica)
     if new_instance:
@@ -62,23 +108,39 @@ def run_open_app(args: Dict[str, Any]) -> Dict[str, Any]:
         cmd.extend(["-a", str(app)])
 
     # Si hay target, puede ser URL o ruta
+    open_target: Optional[str] = None
     if target:
         t = str(target).strip()
 
         # Expandimos ruta si parece path local
         # (si empieza por / o ~, lo tratamos como archivo)
         if t.startswith(("~", "/")):
-            p = Path(t).expanduser().resolve()
-            cmd.append(str(p))
+            open_target = _expand(t)
         else:
             # Si no parece path, lo tratamos como URL o “string” para open
-            cmd.append(t)
+            open_target = t
+        cmd.append(open_target)
 
     # Si hay args extra para la app, se pasan con --args
     if app and extra_app_args:
         cmd.append("--args")
         cmd.extend([str(x) for x in extra_app_args])
 
+    # Caso común (sin -n ni --args): NSWorkspace si PyObjC está disponible
+    if APPKIT_AVAILABLE and not new_instance and not extra_app_args:
+        opened = _open_native(str(app) if app else None, open_target)
+        if opened is not None:
+            return {
+                "command": cmd,
+                "returncode": 0 if opened else 1,
+                "stdout": "",
+                "stderr": "" if opened else "NSWorkspace no pudo abrir el objetivo",
+                "opened_app": str(app) if app else None,
+                "opened_target": str(target) if target else None,
+                "wait": wait,
+                "new_instance": new_instance,
+            }
+
     # Ejecutamos `open`
     completed = subprocess.run(
         cmd,
@@ -0,0 +1,290 @@
+"""
+osascript.py
+
+Ejecución de AppleScript con un proceso osascript persistente.
+
+Lanzar `osascript -e ...` en cada llamada cuesta 150-400 ms antes de
+ejecutar nada (fork+exec, runtime de ObjC, carga del scripting bridge).
+Aquí se mantiene vivo un único osascript (en JavaScript/JXA) que lee
+peticiones por stdin, ejecuta el AppleScript con NSAppleScript y responde
+una línea JSON por petición. Si el proceso no arranca (no es macOS) se usa
+el osascript de siempre, sobre un .scpt compilado una vez con osacompile.
+
+Los scripts con datos variables deben leerlos de "on run argv" y recibirlos
+en args: así el código fuente es fijo, se compila una vez y no hay que
+escapar comillas.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import select
+import subprocess
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Sequence
+
+
+# Bucle del proceso persistente: una petición JSON por línea en stdin
+# ({"script": "...", "args": [...]}) y una respuesta JSON por línea en stdout
+# ({"ok": true, "result": "..."} / {"ok": false, "error": "..."}).
+# Cada script se compila una sola vez; los datos van en args, nunca dentro
+# del código fuente.
+_WORKER_JS = r"""
+ObjC.import('Foundation');
+
+// Scripts ya compilados, por código fuente (acotado: los scripts son fijos)
+var compiled = {};
+var compiledCount = 0;
+var MAX_COMPILED = 64;
+
+function respond(out, obj) {
+    var line = $(JSON.stringify(obj) + '\n');
+    out.writeData(line.dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function errorMessage(error) {
+    var info = ObjC.deepUnwrap(error[0]) || {};
+    return String(info.NSAppleScriptErrorMessage || 'AppleScript error');
+}
+
+function compile(source) {
+    var script = compiled[source];
+    if (script) {
+        return script;
+    }
+    var error = Ref();
+    script = $.NSAppleScript.alloc.initWithSource($(source));
+    if (!script.compileAndReturnError(error)) {
+        throw new Error(errorMessage(error));
+    }
+    if (compiledCount >= MAX_COMPILED) {
+        compiled = {};
+        compiledCount = 0;
+    }
+    compiled[source] = script;
+    compiledCount++;
+    return script;
+}
+
+// Evento 'run' (aevt/oapp) con los argumentos como lista: llega al script
+// como el argv de "on run argv", igual que con `osascript script.scpt a b`
+function runEvent(args) {
+    var list = $.NSAppleEventDescriptor.listDescriptor;
+    for (var i = 0; i < args.length; i++) {
+        list.insertDescriptorAtIndex($.NSAppleEventDescriptor.descriptorWithString($(args[i])), i + 1);
+    }
+    var event = $.NSAppleEventDescriptor.appleEventWithEventClassEventIDTargetDescriptorReturnIDTransactionID(
+        0x61657674, 0x6f617070, $.NSAppleEventDescriptor.nullDescriptor, -1, 0);
+    event.setParamDescriptorForKeyword(list, 0x2d2d2d2d);
+    return event;
+}
+
+function execute(request) {
+    var script = compile(request.script);
+    var error = Ref();
+    var desc = request.args && request.args.length
+        ? script.executeAppleEventError(runEvent(request.args), error)
+        : script.executeAndReturnError(error);
+    if (desc.isNil()) {
+        return {ok: false, error: errorMessage(error)};
+    }
+    return {ok: true, result: desc.stringValue.js || ''};
+}
+
+function run() {
+    var input = $.NSFileHandle.fileHandleWithStandardInput;
+    var out = $.NSFileHandle.fileHandleWithStandardOutput;
+    var buffer = '';
+
+    while (true) {
+        var data = input.availableData;
+        if (data.length === 0) {
+            return;  // EOF: el proceso padre ha cerrado stdin
+        }
+        buffer += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+
+        var nl;
+        while ((nl = buffer.indexOf('\n')) >= 0) {
+            var line = buffer.slice(0, nl);
+            buffer = buffer.slice(nl + 1);
+            // Una línea mal formada responde con error, no tumba el bucle
+            try {
+                respond(out, execute(JSON.parse(line)));
+            } catch (e) {
+                respond(out, {ok: false, error: String(e.message || e)});
+            }
+        }
+    }
+}
+"""
+
+
+class AppleScriptError(RuntimeError):
+    """El AppleScript ha terminado con error."""
+
+
+class _WorkerExited(AppleScriptError):
+    """El proceso persistente ha cerrado stdout (ha muerto o no ha arrancado)."""
+
+
+class _AppleScriptWorker:
+    """Proceso osascript persistente (uno por proceso de Jarvis)."""
+
+    def __init__(self) -> None:
+        self._proc: Optional[subprocess.Popen] = None
+        self._buffer = b""
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                ["osascript", "-l", "JavaScript", "-e", _WORKER_JS],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            self._buffer = b""
+        return self._proc
+
+    def _kill(self) -> None:
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def _read_line(self, proc: subprocess.Popen, deadline: float) -> bytes:
+        fd = proc.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, 0)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise _WorkerExited("El proceso osascript ha terminado")
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line
+
+    def run(self, script: str, args: Sequence[str], timeout: float) -> str:
+        # ensure_ascii: el worker trocea stdin sin cuidar caracteres multibyte
+        payload = {"script": script, "args": [str(a) for a in args]}
+        request = (json.dumps(payload) + "\n").encode("ascii")
+
+        with self._lock:
+            proc = self._ensure_started()
+            try:
+                proc.stdin.write(request)
+                proc.stdin.flush()
+                line = self._read_line(proc, time.monotonic() + timeout)
+            except BaseException:
+                # Timeout o proceso caído: una respuesta tardía no debe
+                # llegar a la siguiente petición, así que se reinicia
+                self._kill()
+                raise
+
+        response = json.loads(line)
+        if not response["ok"]:
+            raise AppleScriptError(response["error"])
+        return response["result"]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._proc is not None:
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=2)
+                except Exception:
+                    self._proc.kill()
+                self._proc = None
+
+
+_WORKER = _AppleScriptWorker()
+
+# None: aún no se ha probado; False: el worker no arranca, usar osascript
+_worker_available: Optional[bool] = None
+
+
+# .scpt compilados para el modo sin worker (clave: hash del código fuente)
+_SCRIPT_CACHE_DIR = Path.home() / "Library" / "Caches" / "jarvis" / "applescript"
+
+
+@lru_cache(maxsize=64)
+def _compiled_script(script: str) -> Path:
+    """Compila script con osacompile (una vez) y devuelve la ruta del .scpt."""
+    digest = hashlib.blake2b(script.encode("utf-8"), digest_size=16).hexdigest()
+    path = _SCRIPT_CACHE_DIR / f"{digest}.scpt"
+    if not path.exists():
+        _SCRIPT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        result = subprocess.run(
+            ["osacompile", "-o", str(tmp_path), "-e", script],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise AppleScriptError(result.stderr.strip())
+        os.replace(tmp_path, path)
+    return path
+
+
+def _run_oneshot(script: str, args: Sequence[str], timeout: float) -> str:
+    result = subprocess.run(
+        ["osascript", str(_compiled_script(script)), *map(str, args)],
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise AppleScriptError(result.stderr.strip())
+    return result.stdout.strip()
+
+
+def run_applescript(
+    script: str,
+    args: Sequence[str] = (),
+    timeout: float = 15.0,
+) -> str:
+    """
+    Ejecuta un AppleScript y devuelve su resultado como texto.
+
+    Args:
+        script: Código fuente (fijo; los datos van en args)
+        args: Argumentos que recibe el script en "on run argv"
+        timeout: Segundos máximos de ejecución
+
+    Raises:
+        AppleScriptError: si el script falla
+        subprocess.TimeoutExpired: si tarda más de timeout segundos
+    """
+    global _worker_available
+
+    if _worker_available is not False:
+        try:
+            result = _WORKER.run(script, args, timeout)
+        except (OSError, ValueError, _WorkerExited):
+            # No se pudo lanzar el worker, o arranca y muere sin responder
+            # (sin JXA/ObjC, bridge roto...): en el primer intento se pasa
+            # al osascript de siempre y no se vuelve a probar
+            if _worker_available is None:
+                _worker_available = False
+            else:
+                raise
+        except AppleScriptError:
+            # El worker ha respondido: el error es del script
+            _worker_available = True
+            raise
+        else:
+            _worker_available = True
+            return result.strip()
+
+    return _run_oneshot(script, args, timeout)
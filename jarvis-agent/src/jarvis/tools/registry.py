@@ -6,17 +6,142 @@ Registro centralizado de herramientas.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Callable, Dict, Optional
+import importlib
+import inspect
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, Literal, Mapping, Optional, Union
+
+
+ParamType = Literal["string", "integer", "boolean", "object", "array"]
+
+
+@dataclass(frozen=True)
+class ParamSpec:
+    """Parámetro de una herramienta (tipado explícito para el schema)."""
+    description: str
+    type: ParamType = "string"
+    required: bool = False
+
+    @classmethod
+    def from_description(cls, description: str) -> "ParamSpec":
+        """Deduce tipo y obligatoriedad del texto (formato antiguo de schema)."""
+        desc_lower = description.lower()
+        if "int" in desc_lower:
+            ptype: ParamType = "integer"
+        elif "bool" in desc_lower:
+            ptype = "boolean"
+        else:
+            ptype = "string"
+        return cls(description, ptype, "obligatorio" in desc_lower)
 
 
 @dataclass
 class ToolSpec:
-    """Especificación de una herramienta."""
+    """
+    Especificación de una herramienta.
+    
+    Todas las tools se llaman con los argumentos como keywords: fn(**args).
+    
+    Los parámetros se declaran en params. schema (nombre -> descripción)
+    se mantiene por compatibilidad y se convierte a params al crear el spec.
+    
+    fn puede ser la función o "modulo:atributo"; en ese caso el módulo no se
+    importa hasta la primera llamada (ver resolve).
+    """
     name: str
     description: str
-    fn: Callable[..., Dict[str, Any]]
+    fn: Union[Callable[..., Dict[str, Any]], str]
     schema: Optional[Dict[str, str]] = None
+    # False si la tool no puede ejecutarse a la vez que otras del mismo turno
+    # (efectos sobre estado compartido: workspace, shell, reproductor...)
+    thread_safe: bool = True
+    params: Dict[str, ParamSpec] = field(default_factory=dict)
+    # Schema "function" para Ollama, calculado una vez al registrar
+    ollama_schema: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False)
+    # Derivados de la firma de fn en resolve(): parámetros obligatorios y
+    # admitidos (None: acepta cualquiera, **kwargs)
+    _required: FrozenSet[str] = field(default=frozenset(), init=False, repr=False)
+    _accepted: Optional[FrozenSet[str]] = field(default=None, init=False, repr=False)
+    _resolved: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.schema and not self.params:
+            self.params = {
+                name: ParamSpec.from_description(str(desc))
+                for name, desc in self.schema.items()
+            }
+
+    def resolve(self) -> Callable[..., Dict[str, Any]]:
+        """
+        Función de la tool, importándola la primera vez si fn es una ruta.
+        
+        La primera vez también se inspecciona su firma (ver validate).
+        """
+        if not self._resolved:
+            if isinstance(self.fn, str):
+                module_name, _, attr = self.fn.partition(":")
+                self.fn = getattr(importlib.import_module(module_name), attr)
+            self._inspect_signature()
+            self._resolved = True
+        return self.fn
+
+    def _inspect_signature(self) -> None:
+        params = list(inspect.signature(self.fn).parameters.values())
+        named = [
+            p for p in params
+            if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)
+        ]
+        self._required = frozenset(p.name for p in named if p.default is p.empty)
+        if any(p.kind is p.VAR_KEYWORD for p in params):
+            self._accepted = None
+        else:
+            self._accepted = frozenset(p.name for p in named)
+
+    def validate(self, args: Mapping[str, Any]) -> Optional[str]:
+        """
+        Comprueba args contra la firma de fn antes de llamarla.
+        
+        Las tools que reciben **args sin más validan ellas mismas.
+        
+        Returns:
+            None si son válidos, o el motivo del error
+        """
+        self.resolve()
+        missing = self._required.difference(args)
+        if missing:
+            return f"faltan parámetros: {', '.join(sorted(missing))}"
+        if self._accepted is not None:
+            unknown = set(args).difference(self._accepted)
+            if unknown:
+                return f"parámetros desconocidos: {', '.join(sorted(unknown))}"
+        return None
+
+    def build_ollama_schema(self) -> Dict[str, Any]:
+        """Schema de la tool en formato Ollama/OpenAI ("type": "function")."""
+        properties: Dict[str, Dict[str, Any]] = {}
+        for name, param in self.params.items():
+            prop: Dict[str, Any] = {"type": param.type, "description": param.description}
+            if param.type == "array":
+                # JSON Schema exige el tipo de los elementos
+                prop["items"] = {"type": "object"}
+            properties[name] = prop
+        required = [name for name, param in self.params.items() if param.required]
+
+        parameters = {
+            "type": "object",
+            "properties": properties,
+            "required": required,
+        } if properties else {"type": "object"}
+
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": parameters,
+            },
+        }
 
 
 class ToolRegistry:
@@ -24,14 +149,24 @@ class ToolRegistry:
 
     def __init__(self) -> None:
         self._tools: Dict[str, ToolSpec] = {}
+        # Vista de solo lectura (sin copia) que sigue a _tools
+        self._view: Mapping[str, ToolSpec] = MappingProxyType(self._tools)
+        # Se incrementa en cada cambio: permite cachear schemas derivados
+        self.version = 0
 
     def register(self, spec: ToolSpec) -> None:
         """Registra una herramienta."""
+        spec.ollama_schema = spec.build_ollama_schema()
         self._tools[spec.name] = spec
+        self.version += 1
 
-    def list(self) -> Dict[str, ToolSpec]:
-        """Lista todas las herramientas."""
-        return self._tools.copy()
+    def get(self, name: str) -> Optional[ToolSpec]:
+        """Devuelve la especificación de una herramienta, o None."""
+        return self._tools.get(name)
+
+    def list(self) -> Mapping[str, ToolSpec]:
+        """Lista todas las herramientas (vista de solo lectura, sin copiar)."""
+        return self._view
 
     def call(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
         """Ejecuta una herramienta por nombre."""
@@ -40,29 +175,29 @@ class ToolRegistry:
             return {"ok": False, "error": f"Tool desconocida: {name}"}
 
         try:
-            return spec.fn(args)
-        except TypeError as e:
-            return {"ok": False, "error": f"Argumentos inválidos: {e}"}
+            fn = spec.resolve()
         except Exception as e:
             return {"ok": False, "error": f"{type(e).__name__}: {e}"}
 
+        # Argumentos validados antes de llamar: un TypeError de dentro de la
+        # tool ya no se confunde con argumentos mal pasados
+        error = spec.validate(args)
+        if error:
+            return {"ok": False, "error": f"Argumentos inválidos: {error}"}
+
+        try:
+            return fn(**args)
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
 
-def build_default_registry() -> ToolRegistry:
-    """Construye el registro por defecto con todas las herramientas."""
-    from jarvis.tools import (
-        filesystem,
-        open_app,
-        run_code,
-        shell,
-        web_search,
-        spotify,
-        calendar,
-        email,
-        vision,
-        code_assistant,
-        knowledge,
-    )
 
+def build_default_registry() -> ToolRegistry:
+    """
+    Construye el registro por defecto con todas las herramientas.
+    
+    Las funciones se registran como "modulo:atributo": cada módulo (y sus
+    dependencias pesadas: chromadb, visión...) se importa al usar la tool.
+    """
     registry = ToolRegistry()
 
     # 1. Shell
@@ -70,12 +205,13 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="shell",
             description="Ejecuta un comando de shell (macOS/Linux)",
-            fn=shell.run_shell,
-            schema={
-                "command": "Comando a ejecutar (obligatorio)",
-                "cwd": "Directorio de trabajo (opcional)",
-                "timeout_sec": "Timeout en segundos (opcional)",
-                "allow_dangerous": "Permitir comandos peligrosos (bool, opcional)",
+            fn="jarvis.tools.shell:run_shell",
+            thread_safe=False,
+            params={
+                "command": ParamSpec("Comando a ejecutar (obligatorio)", required=True),
+                "cwd": ParamSpec("Directorio de trabajo (opcional)"),
+                "timeout_sec": ParamSpec("Timeout en segundos (opcional)", type="integer"),
+                "allow_dangerous": ParamSpec("Permitir comandos peligrosos (bool, opcional)", type="boolean"),
             },
         )
     )
@@ -85,12 +221,14 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="filesystem",
             description="Opera sobre archivos: write_text, read_text, list_dir, mkdir, exists, delete",
-            fn=filesystem.run_filesystem,
-            schema={
-                "action": "write_text, read_text, list_dir, mkdir, exists, delete (obligatorio)",
-                "path": "Ruta relativa al workspace (obligatorio)",
-                "content": "Contenido (para write_text)",
-                "recursive": "Recursivo (bool, para delete/mkdir)",
+            fn="jarvis.tools.filesystem:run_filesystem",
+            thread_safe=False,
+            params={
+                "action": ParamSpec("write_text, read_text, list_dir, mkdir, exists, delete (obligatorio)", required=True),
+                "path": ParamSpec("Ruta relativa al workspace (obligatorio)", required=True),
+                "content": ParamSpec("Contenido (para write_text)"),
+                "recursive": ParamSpec("Recursivo (bool, para delete/mkdir)", type="boolean"),
+                "max_items": ParamSpec("Máximo de entradas (para list_dir, 1-500, default 500)", type="integer"),
             },
         )
     )
@@ -100,12 +238,12 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="open_app",
             description="Abre aplicaciones, URLs o archivos en macOS",
-            fn=open_app.run_open_app,
-            schema={
-                "app": "Nombre de la aplicación (ej: Spotify, Safari)",
-                "target": "URL o ruta de archivo a abrir",
-                "wait": "Esperar a que la app termine (bool)",
-                "new_instance": "Abrir nueva instancia (bool)",
+            fn="jarvis.tools.open_app:run_open_app",
+            params={
+                "app": ParamSpec("Nombre de la aplicación (ej: Spotify, Safari)"),
+                "target": ParamSpec("URL o ruta de archivo a abrir"),
+                "wait": ParamSpec("Esperar a que la app termine (bool)", type="boolean"),
+                "new_instance": ParamSpec("Abrir nueva instancia (bool)", type="boolean"),
             },
         )
     )
@@ -115,12 +253,12 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="run_code",
             description="Ejecuta código Python o Node.js en sandbox Docker",
-            fn=run_code.run_code,
-            schema={
-                "language": "python o node (obligatorio)",
-                "code": "Código a ejecutar",
-                "file": "Ruta a archivo de código",
-                "timeout_sec": "Timeout en segundos (opcional)",
+            fn="jarvis.tools.run_code:run_code",
+            params={
+                "language": ParamSpec("python o node (obligatorio)", required=True),
+                "code": ParamSpec("Código a ejecutar"),
+                "file": ParamSpec("Ruta a archivo de código"),
+                "timeout_sec": ParamSpec("Timeout en segundos (opcional)", type="integer"),
             },
         )
     )
@@ -130,10 +268,10 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="web_search",
             description="Busca información en internet",
-            fn=web_search.run_web_search,
-            schema={
-                "query": "Término de búsqueda (obligatorio)",
-                "limit": "Número de resultados (opcional, max 10)",
+            fn="jarvis.tools.web_search:run_web_search",
+            params={
+                "query": ParamSpec("Término de búsqueda (obligatorio)", required=True),
+                "limit": ParamSpec("Número de resultados (opcional, max 10)", type="integer"),
             },
         )
     )
@@ -143,9 +281,10 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="spotify",
             description="Controla Spotify: play, pause, next, previous, status, volume_up, volume_down",
-            fn=spotify.spotify_control,
-            schema={
-                "action": "play, pause, next, previous, status, volume_up, volume_down (obligatorio)",
+            fn="jarvis.tools.spotify:spotify_control",
+            thread_safe=False,
+            params={
+                "action": ParamSpec("play, pause, next, previous, status, volume_up, volume_down (obligatorio)", required=True),
             },
         )
     )
@@ -155,10 +294,10 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="calendar",
             description="Consulta calendario: today, tomorrow, week, create (recordatorio)",
-            fn=calendar.calendar_query,
-            schema={
-                "action": "today, tomorrow, week, create (obligatorio)",
-                "query": "Título del recordatorio (para create)",
+            fn="jarvis.tools.calendar:calendar_query",
+            params={
+                "action": ParamSpec("today, tomorrow, week, create (obligatorio)", required=True),
+                "query": ParamSpec("Título del recordatorio (para create)"),
             },
         )
     )
@@ -168,12 +307,28 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="send_email",
             description="Envía emails usando Mail.app",
-            fn=email.send_email,
-            schema={
-                "to": "Destinatario (obligatorio)",
-                "subject": "Asunto (obligatorio)",
-                "body": "Cuerpo del mensaje",
-                "action": "send o draft (opcional)",
+            fn="jarvis.tools.email:send_email",
+            params={
+                "to": ParamSpec("Destinatario (obligatorio)", required=True),
+                "subject": ParamSpec("Asunto (obligatorio)", required=True),
+                "body": ParamSpec("Cuerpo del mensaje"),
+                "action": ParamSpec("send o draft (opcional)"),
+            },
+        )
+    )
+
+    # 8b. Email en lote (varios mensajes en una sola ejecución de AppleScript)
+    registry.register(
+        ToolSpec(
+            name="send_email_batch",
+            description="Envía varios emails de una vez con Mail.app (más rápido que send_email uno a uno)",
+            fn="jarvis.tools.email:send_email_batch",
+            params={
+                "emails": ParamSpec(
+                    "Lista de emails, cada uno {to, subject, body, action} (obligatorio)",
+                    type="array",
+                    required=True,
+                ),
             },
         )
     )
@@ -183,11 +338,12 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="vision",
             description="Analiza pantalla: describe, answer, read (OCR), context",
-            fn=vision.vision_command,
-            schema={
-                "action": "describe, answer, read, context (obligatorio)",
-                "question": "Pregunta sobre la pantalla (para answer)",
-                "capture_mode": "full o window (opcional)",
+            fn="jarvis.tools.vision:vision_command",
+            thread_safe=False,
+            params={
+                "action": ParamSpec("describe, answer, read, context (obligatorio)", required=True),
+                "question": ParamSpec("Pregunta sobre la pantalla (para answer)"),
+                "capture_mode": ParamSpec("full o window (opcional)"),
             },
         )
     )
@@ -197,12 +353,12 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="code_assistant",
             description="Genera o edita código. Abre automáticamente en VS Code.",
-            fn=code_assistant.code_assistant,
-            schema={
-                "task": "Descripción de lo que debe programar (obligatorio)",
-                "language": "Lenguaje de programación (python, javascript, etc.)",
-                "file_path": "Ruta del archivo (opcional, se genera auto)",
-                "open_vscode": "Abrir en VS Code (bool, default true)",
+            fn="jarvis.tools.code_assistant:code_assistant",
+            params={
+                "task": ParamSpec("Descripción de lo que debe programar (obligatorio)", required=True),
+                "language": ParamSpec("Lenguaje de programación (python, javascript, etc.)"),
+                "file_path": ParamSpec("Ruta del archivo (opcional, se genera auto)"),
+                "open_vscode": ParamSpec("Abrir en VS Code (bool, default true)", type="boolean"),
             },
         )
     )
@@ -212,17 +368,17 @@ def build_default_registry() -> ToolRegistry:
         ToolSpec(
             name="knowledge",
             description="Gestiona base de conocimiento: search (buscar info), add (añadir doc), add_code (añadir código), add_tutorial (añadir tutorial), list (listar), delete, stats",
-            fn=knowledge.knowledge_tool,
-            schema={
-                "action": "search, add, add_code, add_tutorial, list, delete, stats (obligatorio)",
-                "query": "Consulta de búsqueda (para search)",
-                "content": "Contenido a guardar (para add/add_code/add_tutorial)",
-                "title": "Título o descripción",
-                "language": "Lenguaje (para add_code, default python)",
-                "category": "Categoría (para add_tutorial)",
-                "tags": "Tags separados por comas (para add_code)",
-                "doc_id": "ID del documento (para delete)",
-                "n_results": "Número de resultados (para search, default 3)",
+            fn="jarvis.tools.knowledge:knowledge_tool",
+            params={
+                "action": ParamSpec("search, add, add_code, add_tutorial, list, delete, stats (obligatorio)", required=True),
+                "query": ParamSpec("Consulta de búsqueda (para search)"),
+                "content": ParamSpec("Contenido a guardar (para add/add_code/add_tutorial)"),
+                "title": ParamSpec("Título o descripción"),
+                "language": ParamSpec("Lenguaje (para add_code, default python)"),
+                "category": ParamSpec("Categoría (para add_tutorial)"),
+                "tags": ParamSpec("Tags separados por comas (para add_code)"),
+                "doc_id": ParamSpec("ID del documento (para delete)"),
+                "n_results": ParamSpec("Número de resultados (para search, default 3)", type="integer"),
             },
         )
     )
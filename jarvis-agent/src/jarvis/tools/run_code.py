@@ -51,7 +51,7 @@ def _write_snippet(workspace: Path, language: str, code: str) -> Path:
     return path
 
 
-def run_code(args: Dict[str, Any]) -> Dict[str, Any]:
+def run_code(**args: Any) -> Dict[str, Any]:
     """
     Args:
       - language: "python" | "node" (obligatorio)
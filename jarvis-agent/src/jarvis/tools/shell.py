@@ -53,11 +53,11 @@ def _is_dangerous(command: str) -> bool:
     return any(pat in cmd for pat in DANGEROUS_PATTERNS)
 
 
-def run_shell(args: Dict[str, Any]) -> Dict[str, Any]:
+def run_shell(**args: Any) -> Dict[str, Any]:
     """
     Ejecuta un comando en la shell.
 
-    Args esperados (en el dict):
+    Args esperados (como keywords):
       - command: str (obligatorio)
       - cwd: str (opcional) directorio de trabajo
       - timeout_sec: int (opcional, default 30)
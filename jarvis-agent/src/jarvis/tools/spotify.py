@@ -9,6 +9,8 @@ from __future__ import annotations
 import subprocess
 from typing import Any, Dict
 
+from jarvis.tools.osascript import AppleScriptError, run_applescript
+
 
 def spotify_control(action: str = "status") -> Dict[str, Any]:
     """
@@ -75,17 +77,13 @@ def spotify_control(action: str = "status") -> Dict[str, Any]:
                 "error": f"Acción desconocida: {action}. Usa: play, pause, next, previous, status, volume_up, volume_down"
             }
         
-        # Ejecutar AppleScript
-        result = subprocess.run(
-            ["osascript", "-e", script],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        
-        if result.returncode != 0:
+        # Ejecutar AppleScript (proceso osascript persistente)
+        try:
+            output = run_applescript(script, timeout=10)
+        except AppleScriptError as e:
+            error = str(e)
             # Spotify no está abierto probablemente
-            if "Spotify got an error" in result.stderr or "not running" in result.stderr:
+            if "Spotify got an error" in error or "not running" in error:
                 return {
                     "ok": False,
                     "error": "Spotify no está abierto. Abre Spotify primero."
@@ -93,10 +91,9 @@ def spotify_control(action: str = "status") -> Dict[str, Any]:
             
             return {
                 "ok": False,
-                "error": result.stderr.strip() or "Error ejecutando AppleScript"
+                "error": error or "Error ejecutando AppleScript"
             }
         
-        output = result.stdout.strip()
         return {
             "ok": True,
             "result": output or f"Acción '{action}' ejecutada"
@@ -7,10 +7,10 @@ Combina capturas de pantalla + Accessibility API + análisis con Groq Vision.
 
 from __future__ import annotations
 
-import os
 from pathlib import Path
 from typing import Any, Dict
 
+from jarvis.tools.credentials import get_tool_secrets
 from jarvis.vision.screenshot import capture_screen, capture_active_window
 from jarvis.vision.accessibility import get_system_context, format_context_for_llm
 from jarvis.vision.vision_analyzer import (
@@ -44,7 +44,7 @@ def vision_command(
     capture_mode = (capture_mode or "full").lower().strip()
     
     # Obtener API key de Groq
-    api_key = os.getenv("GROQ_API_KEY", "")
+    api_key = get_tool_secrets().groq_api_key
     
     if not api_key and action != "context":
         return {
@@ -41,7 +41,7 @@ def _strip_tags(s: str) -> str:
     return " ".join(s.split()).strip()
 
 
-def run_web_search(args: Dict[str, Any]) -> Dict[str, Any]:
+def run_web_search(**args: Any) -> Dict[str, Any]:
     """
     Args:
       - query: str (obligatorio)
@@ -120,6 +120,7 @@ def run_cli(settings: Any, paths: Any) -> None:
                     continue
                 
                 elif cmd == "/sessions":
+                    agent.flush_memory()
                     sessions = memory_store.get_recent_sessions(limit=10)
                     if not sessions:
                         console.print("[yellow]No hay sesiones guardadas[/yellow]")
@@ -135,6 +136,7 @@ def run_cli(settings: Any, paths: Any) -> None:
                         continue
                     
                     query = cmd_parts[1]
+                    agent.flush_memory()
                     results = memory_store.search_messages(query, limit=5)
                     
                     if not results:
@@ -170,5 +172,7 @@ def run_cli(settings: Any, paths: Any) -> None:
         if settings.debug:
             import traceback
             traceback.print_exc()
+    finally:
+        agent.close()
     
     console.print(f"\n[dim]Log guardado en: {log_file}[/dim]")
@@ -180,7 +180,7 @@ async def websocket_endpoint(websocket: WebSocket):
             })
             
             try:
-                response = agent.run(user_message)
+                response = await agent.run_async(user_message)
                 
                 await websocket.send_json({
                     "type": "assistant_message",
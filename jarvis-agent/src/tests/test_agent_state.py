@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import pytest
+
+from jarvis.agent.runner import MAX_HISTORY, AgentState
+from jarvis.agent.tool_agent import _SYSTEM_TOKENS, ToolAgent, ToolAgentConfig
+
+
+def _contents(state):
+    return [m["content"] for m in state]
+
+
+def test_token_estimate_tracks_appends():
+    state = AgentState()
+    state.add_user("a" * 40)
+    state.add_assistant("b" * 8)
+    state.add_tool("call-1", "c" * 4)
+
+    assert state.token_estimate() == 13
+
+
+def test_messages_without_text_content_count_zero():
+    state = AgentState()
+    state._append({"role": "assistant", "content": None, "tool_calls": []})
+    state.add_user("abcd")
+
+    assert state.token_estimate() == 1
+
+
+def test_initial_history_is_counted():
+    state = AgentState(history=[{"role": "user", "content": "a" * 40}])
+
+    assert state.token_estimate() == 10
+
+
+def test_clear_resets_counter():
+    state = AgentState()
+    state.add_user("a" * 40)
+    state.clear()
+
+    assert len(state) == 0
+    assert state.token_estimate() == 0
+
+
+def test_get_messages_is_not_a_copy():
+    state = AgentState()
+    state.add_user("hola")
+
+    assert state.get_messages() is state.history
+    assert list(state) == [{"role": "user", "content": "hola"}]
+    assert len(state) == 1
+
+
+def test_agent_keeps_an_empty_state():
+    # Un estado vacío es falsy: el agente no debe sustituirlo por otro
+    state = AgentState()
+    assert not state
+
+    agent = ToolAgent(ToolAgentConfig(), state=state)
+    assert agent.state is state
+
+
+def test_history_never_exceeds_its_bound():
+    state = AgentState(max_messages=8)
+    for i in range(100):
+        state.add_user(str(i))
+        assert len(state) <= 8
+
+    assert _contents(state)[-1] == "99"
+
+
+def test_initial_history_is_cut_to_the_newest_messages():
+    history = [{"role": "user", "content": str(i)} for i in range(5)]
+    state = AgentState(history=history, max_messages=3)
+
+    assert _contents(state) == ["2", "3", "4"]
+    assert state.token_estimate() == 0
+
+
+def test_append_evicts_oldest_half_in_one_block():
+    state = AgentState(max_messages=4)
+    for i in range(4):
+        state.add_user(str(i))
+    assert _contents(state) == ["0", "1", "2", "3"]
+
+    # Lleno: el siguiente mensaje expulsa la mitad más antigua de golpe
+    state.add_assistant("4")
+    assert _contents(state) == ["2", "3", "4"]
+
+    # El prefijo no cambia hasta volver a llenarse
+    state.add_user("5")
+    assert _contents(state) == ["2", "3", "4", "5"]
+    state.add_user("6")
+    assert _contents(state) == ["4", "5", "6"]
+
+
+def test_block_eviction_updates_token_estimate():
+    state = AgentState(max_messages=2)
+    state.add_user("a" * 40)
+    state.add_tool("call-1", "b" * 8)
+    assert state.token_estimate() == 12
+
+    state.add_assistant("c" * 4)
+    assert _contents(state) == ["b" * 8, "c" * 4]
+    assert state.token_estimate() == 3
+
+
+def test_trim_to_tokens_drops_oldest():
+    state = AgentState()
+    for text in ("a" * 40, "b" * 40, "c" * 40):
+        state.add_user(text)
+
+    assert state.trim_to_tokens(20) == 1
+    assert _contents(state) == ["b" * 40, "c" * 40]
+    assert state.token_estimate() == 20
+
+    assert state.trim_to_tokens(20) == 0
+
+
+def test_trim_to_tokens_keeps_last_message():
+    state = AgentState()
+    state.add_user("a" * 40)
+    state.add_user("b" * 400)
+
+    assert state.trim_to_tokens(1) == 1
+    assert _contents(state) == ["b" * 400]
+
+
+def test_agent_trims_to_half_the_budget_when_over():
+    agent = ToolAgent(ToolAgentConfig(max_context_tokens=_SYSTEM_TOKENS + 100))
+    for _ in range(5):
+        agent.state.add_user("x" * 80)   # 20 tokens cada uno
+
+    agent._trim_history()
+    assert len(agent.state) == 5
+
+    agent.state.add_user("x" * 80)
+    agent._trim_history()
+    assert agent.state.token_estimate() <= 50
+    assert len(agent.state) == 2
+
+
+def test_history_limit_is_configurable():
+    assert AgentState().max_messages == MAX_HISTORY
+
+    agent = ToolAgent(ToolAgentConfig(max_history_messages=10))
+    assert agent.state.max_messages == 10
+
+    with pytest.raises(ValueError):
+        AgentState(max_messages=1)
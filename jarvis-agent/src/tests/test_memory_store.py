@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import threading
+import uuid
+
+import pytest
+
+from jarvis.memory.store import MemoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    yield store
+    store.close()
+
+
+def test_messages_are_kept_per_session_in_order(store):
+    a = store.create_session()
+    b = store.create_session()
+    store.add_message(a, "user", "hola")
+    store.add_message(a, "assistant", "buenas")
+    store.add_message(b, "user", "otra")
+
+    assert [(m["role"], m["content"]) for m in store.get_session_messages(a)] == [
+        ("user", "hola"),
+        ("assistant", "buenas"),
+    ]
+    assert len(store.get_session_messages(b)) == 1
+    counts = {s["id"]: s["message_count"] for s in store.get_recent_sessions()}
+    assert counts == {a: 2, b: 1}
+
+
+def test_connection_is_shared_between_threads(store):
+    session_id = store.create_session()
+
+    def write(n):
+        for i in range(20):
+            store.add_message(session_id, "user", f"{n}-{i}")
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store.get_session_messages(session_id)) == 80
+
+
+def test_data_survives_reopening(tmp_path):
+    db_path = tmp_path / "memory.db"
+    store = MemoryStore(db_path)
+    session_id = store.create_session()
+    store.add_message(session_id, "user", "hola")
+    store.close()
+    store.close()  # idempotente (también se llama en atexit)
+
+    reopened = MemoryStore(db_path)
+    try:
+        assert [m["content"] for m in reopened.get_session_messages(session_id)] == ["hola"]
+    finally:
+        reopened.close()
+
+
+def test_batch_inserts(store):
+    session_id = store.create_session()
+    store.add_messages(session_id, [("user", "hola"), ("assistant", "buenas")])
+    store.add_messages(session_id, [])
+    store.add_tool_events(session_id, [("shell", {"cmd": "ls"}, {"ok": True})])
+
+    assert [m["content"] for m in store.get_session_messages(session_id)] == ["hola", "buenas"]
+    row = store._conn.execute(
+        "SELECT tool_name, tool_args FROM tool_events WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    assert row["tool_name"] == "shell"
+    assert '"cmd"' in row["tool_args"]
+
+
+def test_transaction_rolls_back_on_error(store):
+    session_id = store.create_session()
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.add_message(session_id, "user", "perdido")
+            store.add_messages(session_id, [("assistant", "también")])
+            raise RuntimeError
+
+    assert store.get_session_messages(session_id) == []
+
+
+def test_nested_transaction_joins_the_outer_one(store):
+    session_id = store.create_session()
+
+    with store.transaction() as outer:
+        with store.transaction() as inner:
+            assert inner is outer
+            store.add_message(session_id, "user", "dentro")
+        assert store._conn.in_transaction
+
+    assert not store._conn.in_transaction
+    assert len(store.get_session_messages(session_id)) == 1
+
+
+def test_create_session_returns_a_uuid(store):
+    session_id = store.create_session()
+
+    assert str(uuid.UUID(session_id)) == session_id
+    assert [s["id"] for s in store.get_recent_sessions()] == [session_id]
+
+
+def test_session_ids_are_unique(store):
+    ids = {store.create_session() for _ in range(50)}
+    assert len(ids) == 50
+
+
+def _fts_store(store):
+    if not store._fts:
+        pytest.skip("SQLite sin FTS5")
+    return store
+
+
+def test_search_matches_word_prefixes(store):
+    store = _fts_store(store)
+    session_id = store.create_session()
+    store.add_messages(session_id, [
+        ("user", "recuérdame la reunión del lunes"),
+        ("assistant", "Apunto la reunión"),
+        ("user", "pon música"),
+    ])
+
+    contents = {m["content"] for m in store.search_messages("reun")}
+    assert contents == {"recuérdame la reunión del lunes", "Apunto la reunión"}
+
+
+def test_search_ranks_by_relevance(store):
+    store = _fts_store(store)
+    session_id = store.create_session()
+    store.add_message(session_id, "user", "reunión " + "relleno " * 50)
+    store.add_message(session_id, "user", "reunión reunión")
+
+    assert [m["content"] for m in store.search_messages("reunión")][0] == "reunión reunión"
+
+
+@pytest.mark.parametrize(
+    "query, hits",
+    [
+        ('"', 0),
+        ("(", 0),
+        ("reunión AND", 1),
+        ("OR", 1),
+        ("NEAR(lunes valor)", 1),
+        ("lunes*", 1),
+        ("col:valor", 1),
+        ("-lunes", 1),
+        ("^lunes", 1),
+        ("martes", 0),
+    ],
+)
+def test_search_quotes_fts_syntax(store, query, hits):
+    store = _fts_store(store)
+    session_id = store.create_session()
+    store.add_message(session_id, "user", "la reunión del lunes AND OR NEAR col valor")
+
+    # Nada del query se interpreta como sintaxis FTS: ni OperationalError ni
+    # operadores (cada palabra se busca tal cual, como prefijo)
+    assert len(store.search_messages(query)) == hits
+
+
+def test_search_without_words_falls_back_to_like(store):
+    session_id = store.create_session()
+    store.add_message(session_id, "user", "precio: 10 €")
+
+    assert [m["content"] for m in store.search_messages("€")] == ["precio: 10 €"]
+
+
+def test_search_without_fts_uses_like(store):
+    session_id = store.create_session()
+    store.add_message(session_id, "user", "la reunión del lunes")
+    store._fts = False
+
+    assert len(store.search_messages("reunión del")) == 1
+
+
+def test_fts_index_is_rebuilt_for_existing_messages(tmp_path):
+    db_path = tmp_path / "memory.db"
+    store = MemoryStore(db_path)
+    session_id = store.create_session()
+    store.add_message(session_id, "user", "mensaje antiguo")
+    _fts_store(store)
+    store._conn.executescript(
+        "DROP TRIGGER messages_fts_ai; DROP TRIGGER messages_fts_ad; "
+        "DROP TRIGGER messages_fts_au; DROP TABLE messages_fts;"
+    )
+    store.close()
+
+    reopened = MemoryStore(db_path)
+    try:
+        assert [m["content"] for m in reopened.search_messages("antiguo")] == ["mensaje antiguo"]
+    finally:
+        reopened.close()
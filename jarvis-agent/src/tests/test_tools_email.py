@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pytest
+
+from jarvis.tools import email as email_tool
+
+
+def _email(to: str) -> dict:
+    return {"to": to, "subject": "Hola", "body": "..."}
+
+
+@pytest.fixture
+def mail_output(monkeypatch):
+    """Fija lo que devuelve el script de Mail y guarda los argumentos."""
+    calls = []
+
+    def use(output: str) -> list:
+        def fake_run(script, args, timeout):
+            calls.append(list(args))
+            return output
+
+        monkeypatch.setattr(email_tool, "run_applescript", fake_run)
+        return calls
+
+    return use
+
+
+def test_batch_results_keep_email_order(mail_output):
+    calls = mail_output("ok\nerror: buzón lleno\nok")
+
+    result = email_tool.send_email_batch([_email("a@x.es"), _email("b@x.es"), _email("c@x.es")])
+
+    assert [r["ok"] for r in result["results"]] == [True, False, True]
+    assert result["results"][1]["error"] == "buzón lleno"
+    assert result["result"] == "⚠️ 2/3 emails procesados"
+    assert calls[0][::4] == ["a@x.es", "b@x.es", "c@x.es"]
+
+
+def test_batch_invalid_emails_are_not_sent(mail_output):
+    calls = mail_output("ok")
+
+    result = email_tool.send_email_batch([{"to": "", "subject": "x"}, "nada", _email("a@x.es")])
+
+    assert [r["ok"] for r in result["results"]] == [False, False, True]
+    assert calls == [["a@x.es", "Hola", "...", "send"]]
+
+
+def test_batch_mismatched_output_marks_every_email_as_failed(mail_output):
+    # Un error de varias líneas no puede desplazar los resultados de los
+    # emails siguientes
+    mail_output("error: línea 1\nlínea 2\nok")
+
+    result = email_tool.send_email_batch([_email("a@x.es"), _email("b@x.es")])
+
+    assert result["ok"] is False
+    assert [r["ok"] for r in result["results"]] == [False, False]
+    assert "no reconocida" in result["results"][0]["error"]
+
+
+def test_batch_requires_emails():
+    assert email_tool.send_email_batch([])["ok"] is False
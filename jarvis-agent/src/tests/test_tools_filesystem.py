@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import os
+import shutil
+
+import pytest
+
+from jarvis.tools.filesystem import _resolve_in_root, run_filesystem
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "ws"
+    root.mkdir()
+    return root
+
+
+@pytest.fixture
+def outside(tmp_path):
+    out = tmp_path / "fuera"
+    out.mkdir()
+    (out / "secreto.txt").write_text("x")
+    return out
+
+
+def test_exists_does_not_probe_outside_through_symlink(workspace, outside):
+    os.symlink(outside, workspace / "lnk")
+
+    # Exista o no el archivo de fuera, la respuesta tiene que ser la misma
+    for name in ("secreto.txt", "no_existe.txt"):
+        with pytest.raises(PermissionError):
+            run_filesystem(action="exists", root_dir=str(workspace), path=f"lnk/{name}")
+
+
+def test_exists_inside_workspace(workspace):
+    (workspace / "sub").mkdir()
+    (workspace / "a.txt").write_text("a")
+
+    result = run_filesystem(action="exists", root_dir=str(workspace), path="a.txt")
+    assert result["exists"] is True
+    assert result["is_dir"] is False
+
+    result = run_filesystem(action="exists", root_dir=str(workspace), path="sub")
+    assert result["is_dir"] is True
+
+    result = run_filesystem(action="exists", root_dir=str(workspace), path="nada/b.txt")
+    assert result["exists"] is False
+    assert result["is_dir"] is None
+
+
+def _make_files(root, n):
+    for i in range(n):
+        (root / f"f{i:02d}.txt").write_text("x")
+
+
+def test_list_dir_truncates_in_name_order(workspace):
+    _make_files(workspace, 7)
+
+    result = run_filesystem(action="list_dir", root_dir=str(workspace), max_items=3)
+    assert [item["name"] for item in result["items"]] == ["f00.txt", "f01.txt", "f02.txt"]
+    assert result["truncated"] is True
+    assert result["total"] == 7
+
+
+def test_list_dir_not_truncated(workspace):
+    _make_files(workspace, 3)
+
+    result = run_filesystem(action="list_dir", root_dir=str(workspace))
+    assert len(result["items"]) == 3
+    assert "truncated" not in result
+
+
+@pytest.mark.parametrize("max_items", [0, -5])
+def test_list_dir_clamps_non_positive_max_items(workspace, max_items):
+    _make_files(workspace, 4)
+
+    result = run_filesystem(action="list_dir", root_dir=str(workspace), max_items=max_items)
+    assert [item["name"] for item in result["items"]] == ["f00.txt"]
+    assert result["truncated"] is True
+    assert result["total"] == 4
+
+
+def test_list_dir_null_max_items_uses_default(workspace):
+    _make_files(workspace, 4)
+
+    result = run_filesystem(action="list_dir", root_dir=str(workspace), max_items=None)
+    assert len(result["items"]) == 4
+
+
+def test_resolve_in_root_rejects_sibling_with_same_prefix(tmp_path):
+    root = tmp_path / "ws"
+    root.mkdir()
+    sibling = tmp_path / "ws-secretos"
+    sibling.mkdir()
+    os.symlink(sibling, root / "lnk")
+
+    with pytest.raises(PermissionError):
+        _resolve_in_root(root.resolve(), "lnk/x.txt")
+
+
+def test_resolve_in_root_accepts_root_and_children(workspace):
+    root = workspace.resolve()
+
+    assert _resolve_in_root(root, ".") == root
+    assert _resolve_in_root(root, "a/../b.txt") == root / "b.txt"
+    with pytest.raises(PermissionError):
+        _resolve_in_root(root, "../fuera.txt")
+    with pytest.raises(PermissionError):
+        _resolve_in_root(root, "/etc/passwd")
+
+
+def test_strict_symlinks_rejects_link_inside_workspace(workspace):
+    (workspace / "real").mkdir()
+    os.symlink(workspace / "real", workspace / "lnk")
+
+    with pytest.raises(PermissionError):
+        run_filesystem(action="write_text", root_dir=str(workspace), path="lnk/a.txt", content="x")
+    # Leer a través de un enlace interno sigue permitido
+    (workspace / "real" / "b.txt").write_text("b")
+    result = run_filesystem(action="read_text", root_dir=str(workspace), path="lnk/b.txt")
+    assert result["content"] == "b"
+
+
+def test_relative_root_follows_current_directory(tmp_path, monkeypatch):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+
+    monkeypatch.chdir(tmp_path / "a")
+    first = run_filesystem(action="write_text", root_dir="ws", path="x.txt", content="a")
+    monkeypatch.chdir(tmp_path / "b")
+    second = run_filesystem(action="write_text", root_dir="ws", path="x.txt", content="b")
+
+    assert first["path"] == str((tmp_path / "a" / "ws" / "x.txt").resolve())
+    assert second["path"] == str((tmp_path / "b" / "ws" / "x.txt").resolve())
+
+
+def test_deleted_workspace_is_recreated(workspace):
+    run_filesystem(action="mkdir", root_dir=str(workspace), path="sub")
+    shutil.rmtree(workspace)
+
+    result = run_filesystem(action="write_text", root_dir=str(workspace), path="a.txt", content="x")
+    assert (workspace / "a.txt").read_text() == "x"
+    assert result["bytes"] == 1
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+from jarvis.tools import osascript
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Worker nuevo (sin probar) cuyo proceso es el comando que se indique."""
+    worker = osascript._AppleScriptWorker()
+    monkeypatch.setattr(osascript, "_WORKER", worker)
+    monkeypatch.setattr(osascript, "_worker_available", None)
+    oneshot_calls = []
+
+    def fake_oneshot(script, args, timeout):
+        oneshot_calls.append(script)
+        return "oneshot"
+
+    monkeypatch.setattr(osascript, "_run_oneshot", fake_oneshot)
+
+    def use(code: str) -> list:
+        def start():
+            if worker._proc is None or worker._proc.poll() is not None:
+                worker._proc = subprocess.Popen(
+                    [sys.executable, "-c", code],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+                worker._buffer = b""
+            return worker._proc
+
+        monkeypatch.setattr(worker, "_ensure_started", start)
+        return oneshot_calls
+
+    yield use
+    worker.close()
+
+
+def test_worker_that_exits_at_start_falls_back_to_oneshot(worker):
+    oneshot_calls = worker("pass")
+
+    assert osascript.run_applescript("return 1") == "oneshot"
+    assert osascript._worker_available is False
+
+    # Ya no se vuelve a lanzar el worker
+    assert osascript.run_applescript("return 2") == "oneshot"
+    assert oneshot_calls == ["return 1", "return 2"]
+
+
+def test_working_worker_is_kept(worker):
+    oneshot_calls = worker(
+        "import sys\n"
+        "for _ in sys.stdin:\n"
+        "    print('{\"ok\": true, \"result\": \" hola \"}', flush=True)\n"
+    )
+
+    assert osascript.run_applescript("x") == "hola"
+    assert osascript.run_applescript("x") == "hola"
+    assert osascript._worker_available is True
+    assert oneshot_calls == []
+
+
+def test_worker_dying_after_working_raises(worker, monkeypatch):
+    worker("pass")
+    monkeypatch.setattr(osascript, "_worker_available", True)
+
+    with pytest.raises(osascript.AppleScriptError):
+        osascript.run_applescript("x")
+
+
+def test_script_errors_are_not_a_fallback(worker):
+    oneshot_calls = worker(
+        "import sys\n"
+        "for _ in sys.stdin:\n"
+        "    print('{\"ok\": false, \"error\": \"fallo\"}', flush=True)\n"
+    )
+
+    with pytest.raises(osascript.AppleScriptError, match="fallo"):
+        osascript.run_applescript("x")
+    assert osascript._worker_available is True
+    assert oneshot_calls == []
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from typing import Any
+
+from jarvis.tools.registry import ParamSpec, ToolRegistry, ToolSpec, build_default_registry
+
+
+def _greet(name: str, punctuation: str = "!") -> dict:
+    return {"ok": True, "result": f"hola {name}{punctuation}"}
+
+
+def _echo(**args: Any) -> dict:
+    return {"ok": True, "args": args}
+
+
+def _boom(x: int) -> dict:
+    raise TypeError("fallo interno")
+
+
+def _registry(*specs: ToolSpec) -> ToolRegistry:
+    registry = ToolRegistry()
+    for spec in specs:
+        registry.register(spec)
+    return registry
+
+
+def test_validate_missing_and_unknown_params():
+    spec = ToolSpec(name="greet", description="", fn=_greet)
+
+    assert spec.validate({"name": "Ana"}) is None
+    assert spec.validate({"name": "Ana", "punctuation": "?"}) is None
+    assert spec.validate({}) == "faltan parámetros: name"
+    assert spec.validate({"name": "Ana", "x": 1, "a": 2}) == "parámetros desconocidos: a, x"
+
+
+def test_validate_var_keyword_accepts_anything():
+    spec = ToolSpec(name="echo", description="", fn=_echo)
+
+    assert spec.validate({}) is None
+    assert spec.validate({"lo": "que", "sea": 1}) is None
+
+
+def test_call_dispatches_by_keyword():
+    registry = _registry(
+        ToolSpec(name="greet", description="", fn=_greet),
+        ToolSpec(name="echo", description="", fn=_echo),
+    )
+
+    assert registry.call("greet", {"punctuation": "?", "name": "Ana"})["result"] == "hola Ana?"
+    assert registry.call("echo", {"a": 1})["args"] == {"a": 1}
+
+
+def test_call_reports_invalid_args_before_calling():
+    registry = _registry(ToolSpec(name="greet", description="", fn=_greet))
+
+    result = registry.call("greet", {"nombre": "Ana"})
+    assert result["ok"] is False
+    assert result["error"].startswith("Argumentos inválidos: faltan parámetros: name")
+
+
+def test_call_wraps_errors_raised_inside_the_tool():
+    registry = _registry(ToolSpec(name="boom", description="", fn=_boom))
+
+    result = registry.call("boom", {"x": 1})
+    assert result == {"ok": False, "error": "TypeError: fallo interno"}
+
+
+def test_call_unknown_tool():
+    assert ToolRegistry().call("nada", {}) == {"ok": False, "error": "Tool desconocida: nada"}
+
+
+def test_lazy_fn_is_imported_on_resolve():
+    spec = ToolSpec(name="fs", description="", fn="jarvis.tools.filesystem:run_filesystem")
+    registry = _registry(spec)
+
+    assert isinstance(spec.fn, str)
+    assert spec.validate({"action": "exists"}) is None
+    assert callable(spec.fn)
+    assert registry.get("fs") is spec
+
+
+def test_bad_lazy_path_is_reported_as_error():
+    registry = _registry(ToolSpec(name="x", description="", fn="jarvis.tools.filesystem:no_existe"))
+
+    result = registry.call("x", {})
+    assert result["ok"] is False
+    assert result["error"].startswith("AttributeError")
+
+
+def test_schema_from_legacy_descriptions():
+    spec = ToolSpec(
+        name="t",
+        description="d",
+        fn=_echo,
+        schema={"n": "int obligatorio", "flag": "bool", "texto": "string"},
+    )
+
+    assert spec.params["n"] == ParamSpec("int obligatorio", "integer", True)
+    assert spec.params["flag"].type == "boolean"
+    assert spec.params["texto"].type == "string"
+
+    function = spec.build_ollama_schema()["function"]
+    assert function["parameters"]["required"] == ["n"]
+
+
+def test_list_is_a_live_read_only_view():
+    registry = ToolRegistry()
+    view = registry.list()
+    version = registry.version
+
+    registry.register(ToolSpec(name="echo", description="", fn=_echo))
+    assert "echo" in view
+    assert registry.version == version + 1
+
+
+def test_default_registry_schemas_are_precomputed():
+    registry = build_default_registry()
+
+    assert registry.list()
+    for spec in registry.list().values():
+        assert spec.ollama_schema["function"]["name"] == spec.name